@@ -7,7 +7,7 @@ import os
 from MyCapytain.resources.texts.local.capitains.cts import CapitainsCtsText
 from MyCapytain.common.constants import Mimetypes
 from lxml import etree
-from multiprocessing.pool import Pool
+from HookTest.executors import executor
 
 
 class Build(object):
@@ -23,9 +23,13 @@ class Build(object):
     :type txt: bool
     :param cites: whether to include the citation string for each of the lowest level citation elements
     :type cites: bool
+    :param workers: the number of workers to use in building plain text
+    :type workers: int
+    :param executor: the workers building plain text, one of HookTest.executors.EXECUTORS
+    :type executor: str
     """
 
-    def __init__(self, path, dest, tar=False, txt=False, cites=False, workers=3):
+    def __init__(self, path, dest, tar=False, txt=False, cites=False, workers=3, executor="process"):
         """
 
         :param path: the path to the directory that contains the corpus's data directory
@@ -38,8 +42,10 @@ class Build(object):
         :type txt: bool
         :param cites: whether to include the citation string for each of the lowest level citation elements
         :type cites: bool
-        :param workers: the number of processes to use in building plain text
+        :param workers: the number of workers to use in building plain text
         :type workers: int
+        :param executor: the workers building plain text, one of HookTest.executors.EXECUTORS
+        :type executor: str
         """
 
         if path.endswith('/'):
@@ -54,6 +60,7 @@ class Build(object):
         self.txt = txt
         self.cites = cites
         self.workers = workers
+        self.executor = executor
 
     def repo_file_list(self):
         """ Build the list of XML files for the source repo represented by self.path
@@ -105,17 +112,18 @@ class Build(object):
         passing_texts = [x for x in glob('{}data/*/*/*.xml'.format(self.dest)) if '__cts__' not in x]
         sys.stdout.write('Extracting Text.\n')
         sys.stdout.flush()
-        with Pool(processes=self.workers) as executor:
+        with executor(self.executor, self.workers) as pool:
             # Send the tasks in order to the pool
-            for _ in executor.imap_unordered(self.build_texts, [text for text in passing_texts]):
+            for _ in pool.imap_unordered(self.build_texts, [text for text in passing_texts]):
                 sys.stdout.write('.')
                 sys.stdout.flush()
 
             # Required for coverage
-            executor.close()
-            executor.join()
+            pool.close()
+            pool.join()
 
     def build_texts(self, text):
+        # Unlike the parser of the tests, the default one replaces the internal entities by their text
         interactive_text = CapitainsCtsText(resource=etree.parse(text).getroot())
         reffs = interactive_text.getReffs(level=len(interactive_text.citation))
         passages = [interactive_text.getTextualNode(passage) for passage in reffs]
@@ -169,7 +177,8 @@ def cmd(**kwargs):
     """
     if kwargs['travis'] is True:
         status, message = Travis(path=kwargs['path'], dest=kwargs['dest'], tar=kwargs['tar'],
-                                 txt=kwargs['txt'], cites=kwargs['cites'], workers=int(kwargs['workers'])).run()
+                                 txt=kwargs['txt'], cites=kwargs['cites'], workers=int(kwargs['workers']),
+                                 executor=kwargs.get('executor', 'process')).run()
         return status, message
     else:
         return False, 'You cannot run build on the base class'
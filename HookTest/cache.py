@@ -0,0 +1,162 @@
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from hashlib import md5
+
+try:
+    import fcntl
+except ImportError:
+    # Without file locks, concurrent processes might download the same file twice but atomic renames keep it whole
+    fcntl = None
+
+
+#: Default location of the HookTest cache, following the XDG base directory specification
+DIRECTORY = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "hooktest"
+)
+
+_DIGESTS = {}
+
+
+def digest(path):
+    """ Get the MD5 hash of a file content. Hashes are kept in memory as long as the file is not modified
+
+    :param path: Path of the file
+    :type path: str
+    :rtype: str
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _DIGESTS:
+        with open(path, "rb") as f:
+            _DIGESTS[key] = md5(f.read()).hexdigest()
+    return _DIGESTS[key]
+
+
+@contextmanager
+def lock(path):
+    """ Hold an exclusive lock on a file, waiting for other processes holding it
+
+    :param path: Path of the lock file
+    :type path: str
+    """
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def write(path, content):
+    """ Write a file atomically, so that concurrent readers never see it partially written
+
+    :param path: Path of the file
+    :type path: str
+    :param content: Content of the file
+    :type content: bytes
+    """
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            f.write(content)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+class ResultCache(object):
+    """ JSON results stored on disk, one file per key
+
+    Entries are refreshed each time they are read : eviction removes the entries which were not used for MAX_AGE \
+    seconds, then the least recently used ones until the cache is under MAX_SIZE bytes.
+
+    :param directory: Directory of the cache
+    :type directory: str
+    """
+    MAX_AGE = 30 * 24 * 3600
+    MAX_SIZE = 100 * 1024 * 1024
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    @staticmethod
+    def key(*parts):
+        """ Build a key from the elements a result depends on
+
+        :param parts: Content hashes, versions...
+        :type parts: str
+        :rtype: str
+        """
+        return md5("\t".join(parts).encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        """ Read a result
+
+        :param key: Key of the result
+        :returns: Stored result or None
+        """
+        path = self.path(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+            os.utime(path)
+            return result
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, result):
+        """ Store a result. Failure to write is ignored, the cache being only an optimization
+
+        :param key: Key of the result
+        :param result: JSON serializable result
+        """
+        path = self.path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write(path, json.dumps(result).encode("utf-8"))
+        except OSError:
+            pass
+
+    def evict(self, max_age=None, max_size=None):
+        """ Remove old entries and the least recently used ones when the cache is too big
+
+        :param max_age: Age in seconds after which an unused entry is removed. Defaults to MAX_AGE
+        :type max_age: int
+        :param max_size: Size in bytes of the cache after eviction. Defaults to MAX_SIZE
+        :type max_size: int
+        :returns: Number of removed entries
+        :rtype: int
+        """
+        max_age = ResultCache.MAX_AGE if max_age is None else max_age
+        max_size = ResultCache.MAX_SIZE if max_size is None else max_size
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        removed, size, limit = 0, sum(entry[1] for entry in entries), time.time() - max_age
+        for mtime, entry_size, path in sorted(entries):
+            if mtime >= limit and size <= max_size:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+                size -= entry_size
+            except OSError:
+                pass
+        return removed
@@ -1,24 +1,59 @@
 import re
-import subprocess
-import warnings
-from threading import Timer
 from collections import defaultdict
-from os import makedirs, environ
+from os import environ
 import os.path
-from hashlib import md5
-import time
-import requests
-import shutil
-from lxml.etree import parse
 import validators
+from lxml import etree
 
 import MyCapytain.common
-from MyCapytain.common.constants import Mimetypes
-from MyCapytain.errors import DuplicateReference, EmptyReference, MissingRefsDecl
+from MyCapytain.errors import MissingRefsDecl
 from MyCapytain.resources.collections.cts import XmlCtsTextgroupMetadata, XmlCtsWorkMetadata
-from MyCapytain.resources.texts.local.capitains.cts import CapitainsCtsText
 
 from HookTest.units import TESTUnit
+from HookTest.capitains_units.references import References
+import HookTest.rng
+
+
+#: Elements of a metadata file checked by CTSMetadata_TestUnit, searched at once
+METADATA_MEMBERS = etree.XPath(
+    "//ti:textgroup|//ti:work|//ti:edition|//ti:translation|//ti:commentary", namespaces=TESTUnit.NS
+)
+#: Nodes holding the URN of a text following the EpiDoc guidelines
+EPIDOC_URN = etree.XPath(
+    "//tei:body/tei:div[@type='edition' or @type='translation' or @type='commentary']"
+    "[starts-with(@n, 'urn:cts:')]",
+    namespaces=TESTUnit.NS
+)
+#: Types of the divisions holding the URN of a text following the EpiDoc guidelines, in order of preference
+EPIDOC_TYPES = ["edition", "translation", "commentary"]
+#: Node holding the URN and the language of a text following the EpiDoc guidelines
+EPIDOC_LANGUAGE = etree.XPath(
+    "//tei:text/tei:body/tei:div[@type='edition' or @type='translation' or @type='commentary']"
+    "[starts-with(@n, 'urn:cts:')]",
+    namespaces=TESTUnit.NS
+)
+#: Nodes holding the URN of a text following the TEI guidelines
+TEI_URN = etree.XPath(
+    "//tei:text/tei:body[starts-with(@n, 'urn:cts:')]", namespaces=TESTUnit.NS
+)
+TEI_BASE_URN = etree.XPath(
+    "//tei:text[starts-with(@xml:base, 'urn:cts:')]", namespaces=TESTUnit.NS
+)
+#: Elements whose text is left out of the word count, with their descendants
+UNCOUNTED = frozenset(["{http://www.tei-c.org/ns/1.0}note", "{http://www.tei-c.org/ns/1.0}teiHeader"])
+
+
+def tokens(text):
+    """ Count the words of a string, as matched by CTSText_TestUnit.splitter : str.split splits on the same whitespace \
+    characters
+
+    :param text: String
+    :type text: str
+    :rtype: int
+    """
+    if not text:
+        return 0
+    return len(text.split())
 
 
 class CTSMetadata_TestUnit(TESTUnit):
@@ -61,6 +96,22 @@ class CTSMetadata_TestUnit(TESTUnit):
         super(CTSMetadata_TestUnit, self).__init__(*args, **kwargs)
         self.urns = []
         self.type = None
+        self.__members = (None, None)
+
+    def members(self, *names):
+        """ Get the textgroup, work, edition, translation and commentary elements of the file. The tree is searched \
+        once for all of them
+
+        :param names: Local names of the elements to return
+        :type names: str
+        :returns: Elements in document order
+        :rtype: [lxml.etree._Element]
+        """
+        tree, members = self.__members
+        if tree is not self.xml:
+            members = [(etree.QName(member).localname, member) for member in METADATA_MEMBERS(self.xml)]
+            self.__members = (self.xml, members)
+        return [member for name, member in members if name in names]
 
     def capitain(self):
         """ Load the file in MyCapytain
@@ -109,19 +160,20 @@ class CTSMetadata_TestUnit(TESTUnit):
             elif self.type == "work":
                 status = True
 
+                lang = "{http://www.w3.org/XML/1998/namespace}lang"
                 # Check that the work has a language
-                workLang = self.xml.xpath("//ti:work/@xml:lang", namespaces=TESTUnit.NS)
+                workLang = [work for work in self.members("work") if work.get(lang) is not None]
                 if len(workLang) != 1:
                     status = False
                     self.log("Work node is missing its lang attribute")
 
-                langs = self.xml.xpath("//ti:translation/@xml:lang", namespaces=TESTUnit.NS)
-                if len(langs) != len(self.xml.xpath("//ti:translation", namespaces=TESTUnit.NS)):
+                translations = self.members("translation")
+                if any(translation.get(lang) is None for translation in translations):
                     status = False
                     self.log("Translation(s) are missing lang attribute")
 
-                com_langs = self.xml.xpath("//ti:commentary/@xml:lang", namespaces=TESTUnit.NS)
-                if len(com_langs) != len(self.xml.xpath("//ti:commentary", namespaces=TESTUnit.NS)):
+                commentaries = self.members("commentary")
+                if any(commentary.get(lang) is None for commentary in commentaries):
                     status = False
                     self.log("Some Commentaries are missing lang attribute")
 
@@ -159,12 +211,13 @@ class CTSMetadata_TestUnit(TESTUnit):
         status = False
         if self.xml:
             if self.type == "textgroup":
+                groupUrns = [group.get("urn") for group in self.members("textgroup") if group.get("urn") is not None]
                 urns = [
                     urn
-                    for urn in self.xml.xpath("//ti:textgroup/@urn", namespaces=TESTUnit.NS)
+                    for urn in groupUrns
                     if urn and len(MyCapytain.common.reference.URN(urn)) == 3
                 ]
-                self.log("Group urn :" + "".join(self.xml.xpath("//ti:textgroup/@urn", namespaces=TESTUnit.NS)))
+                self.log("Group urn :" + "".join(groupUrns))
                 status = len(urns) == 1
                 if status:
                     self.urn = urns[0]
@@ -172,15 +225,16 @@ class CTSMetadata_TestUnit(TESTUnit):
                 matches = True
                 onlyOneWork = True
                 allMembers = True
+                works = self.members("work")
                 worksUrns = [
-                    urn
-                    for urn in self.xml.xpath("//ti:work/@urn", namespaces=TESTUnit.NS)
-                    if urn and len(MyCapytain.common.reference.URN(urn)) == 4
+                    work.get("urn")
+                    for work in works
+                    if work.get("urn") and len(MyCapytain.common.reference.URN(work.get("urn"))) == 4
                 ]
                 groupUrns = [
-                    urn
-                    for urn in self.xml.xpath("//ti:work/@groupUrn", namespaces=TESTUnit.NS)
-                    if urn and len(MyCapytain.common.reference.URN(urn)) == 3
+                    work.get("groupUrn")
+                    for work in works
+                    if work.get("groupUrn") and len(MyCapytain.common.reference.URN(work.get("groupUrn"))) == 3
                 ]
                 self.urn = None
                 urn = None
@@ -203,7 +257,7 @@ class CTSMetadata_TestUnit(TESTUnit):
                 self.log("Group urn : " + "".join(groupUrns))
                 self.log("Work urn : " + "".join(worksUrns))
 
-                texts = self.xml.xpath("//ti:edition|//ti:translation|//ti:commentary", namespaces=TESTUnit.NS)
+                texts = self.members("edition", "translation", "commentary")
 
                 for text in texts:
                     t_urn = text.get("urn")
@@ -278,11 +332,16 @@ class CTSText_TestUnit(TESTUnit):
     :type path: basestring
     :param countwords: Count the number of words and log it if necessary
     :type countwords: bool
+    :param large_file: Size in bytes above which the file is parsed with a huge tree parser, without keeping its \
+    content next to the tree
+    :type large_file: int
 
     :cvar tests: Contains the list of methods to be run again the text
     :type tests: [str]
     :cvar readable: Human friendly string associated to object methods
     :type readable: dict
+    :cvar untied: Tests which only use the URN found by previous tests and never the parsed file
+    :type untied: [str]
 
     :ivar inv: List of URN retrieved in metadata. Used to check the availability of metadata for the text
     :type inv: [str]
@@ -300,6 +359,9 @@ class CTSText_TestUnit(TESTUnit):
 
     .. note:: All method in CTSText_TestUnit.tests ( "parsable", "has_urn", "naming_convention", "refsDecl", "passages", \
     "unique_passage", "inventory" ) yield at least one boolean (might be more) which represents the success of it.
+
+    .. note:: The parsed file and the Text are released as soon as the last test which needs them is done, \
+    see CTSText_TestUnit.needs_tree
     """
 
     tests = [
@@ -317,6 +379,10 @@ class CTSText_TestUnit(TESTUnit):
         "refsDecl",
         "passages"
     ]
+    untied = [
+        "inventory",
+        "naming_convention"
+    ]
     readable = {
         "parsable": "File parsing",
         "refsDecl": "RefsDecl parsing",
@@ -344,7 +410,6 @@ class CTSText_TestUnit(TESTUnit):
         self.guidelines = None
         self.rng = None
         self.Text = None
-        self.xml = None
         self.count = 0
         self.countwords = countwords
         self.citation = list()
@@ -355,6 +420,8 @@ class CTSText_TestUnit(TESTUnit):
         self.test_status = defaultdict(bool)
         self.lang = ''
         self.dtd_errors = list()
+        self.pending = dict()
+        self.__references = (None, None)
         super(CTSText_TestUnit, self).__init__(path, *args, **kwargs)
 
     def parsable(self):
@@ -362,12 +429,16 @@ class CTSText_TestUnit(TESTUnit):
 
         .. note:: Override super(parsable) and add CapiTainS Ingesting to it
         """
+        if self.document.large:
+            self.log("Large file ({0:.1f}MB) : parsed with a huge tree parser".format(
+                self.document.size / 1024 / 1024
+            ))
         status = next(
             super(CTSText_TestUnit, self).parsable()
         )
         if status is True:
             try:
-                self.Text = CapitainsCtsText(resource=self.xml.getroot())
+                self.Text = self.document.text()
             except MissingRefsDecl as E:
                 self.Text = None
                 self.log(str(E))
@@ -391,54 +462,99 @@ class CTSText_TestUnit(TESTUnit):
             yield False
 
     def run_rng(self, rng_path):
-        """ Run the RNG through JingTrang
+        """ Run the RNG through JingTrang or lxml, depending on the engine set in HookTest.rng.SETTINGS
 
         :param rng_path: Path to the RelaxNG file to run against the XML to test
+
+        .. note:: When the result cache is enabled, files which did not change since a previous run are not validated
         """
-        test = subprocess.Popen(
-            ["java", "-Duser.country=US", "-Duser.language=en", "-jar", TESTUnit.JING, rng_path, self.path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=False
-        )
-        out = []
-        error = []
-        timer = Timer(self.timeout, test.kill)
-        try:
-            timer.start()
-            out, error = test.communicate()
-        except Exception as E:
-            self.error(E)
-            yield False
-            pass
-        finally:
-            if not timer.is_alive():
-                self.log("Timeout on RelaxNG")
-                yield False
-                timer.cancel()
+        cached = HookTest.rng.cached(rng_path, self.path)
+        if cached is not None:
+            for issue in cached["dtd_errors"]:
+                self.log(issue)
+                self.dtd_errors.append(issue)
+            yield cached["status"]
+            return
+
+        tree = None
+        if rng_path in self.pending:
+            validation = self.pending.pop(rng_path).result()
+        elif HookTest.rng.SETTINGS["engine"] == "lxml":
+            # Parsed by parsable, unless the validation is run on its own
+            try:
+                tree = self.parse()
+            except Exception:
                 pass
-            timer.cancel()
+            validation = HookTest.rng.validate(rng_path, self.path, self.timeout, tree=tree)
+        else:
+            validation = HookTest.rng.validate(rng_path, self.path, self.timeout)
+        if validation.exception is not None:
+            self.error(validation.exception)
+            yield False
+        if validation.timeout:
+            self.log("Timeout on RelaxNG")
+            yield False
 
         # This is to deal with Travis printing a message about the _JAVA_OPTIONS when a java command is run
         # Travis printing this command resulted in this test not passing
-        out = '\n'.join([x for x in out.decode().split('\n') if '_JAVA_OPTIONS' not in x]).encode()
-        error = '\n'.join([x for x in error.decode().split('\n') if '_JAVA_OPTIONS' not in x]).encode()
+        out = [line for line in validation.out.splitlines() if b'_JAVA_OPTIONS' not in line]
+        error = [line for line in validation.error.splitlines() if b'_JAVA_OPTIONS' not in line]
 
+        issues = []
         if len(out) > 0:
-            for issue in TESTUnit.rng_logs(out):
-                self.log(issue)
-                self.dtd_errors.append(issue)
-        yield len(out) == 0 and len(error) == 0
+            issues += TESTUnit.rng_logs(out)
+        if validation.issues:
+            issues += TESTUnit.relaxng_logs(validation.issues)
+        if validation.truncated:
+            issues.append("RelaxNG validation stopped after {0} errors".format(HookTest.rng.SETTINGS["max_errors"]))
+        for issue in issues:
+            self.log(issue)
+            self.dtd_errors.append(issue)
+        status = len(out) == 0 and len(error) == 0 and not validation.issues and not validation.truncated
+        if validation.exception is None and not validation.timeout:
+            HookTest.rng.store(rng_path, self.path, status, issues)
+        yield status
+
+    def start_rng(self):
+        """ Start the RelaxNG validations of the scheme in background threads, so that Jing validates the file while \
+        the other tests run. Their results are collected by run_rng
+
+        .. note:: The lxml engine validates in-process and is not started in advance
+        """
+        if HookTest.rng.SETTINGS["engine"] == "lxml":
+            return
+        if self.scheme == "epidoc":
+            rng_paths = [TESTUnit.EPIDOC]
+        elif self.scheme == "tei":
+            rng_paths = [TESTUnit.TEI_ALL]
+        elif self.scheme == "local_file":
+            rng_paths = [self.rng]
+        else:
+            rng_paths = []
+            for rng_path in self.xml_model_uris():
+                if validators.url(rng_path):
+                    try:
+                        rng_path = self.get_remote_rng(rng_path)
+                    except Exception:
+                        # Reported by auto_rng
+                        continue
+                if os.path.isfile(rng_path):
+                    rng_paths.append(rng_path)
+        for rng_path in rng_paths:
+            if rng_path not in self.pending and HookTest.rng.cached(rng_path, self.path) is None:
+                self.pending[rng_path] = HookTest.rng.submit(rng_path, self.path, self.timeout)
 
     def auto_rng(self):
-        xml = parse(self.path)
-        xml_dir = os.path.dirname(os.path.abspath(self.path))
         # A file can have multiple schema
-        for rng in xml.xpath("/processing-instruction('xml-model')"):
-            uri = rng.attrib["href"]
-            rng_path = os.path.abspath(os.path.join(xml_dir, uri))
-            if validators.url(uri):
-                rng_path = self.get_remote_rng(uri)
+        for rng_path in self.xml_model_uris():
+            if validators.url(rng_path):
+                try:
+                    rng_path = self.get_remote_rng(rng_path)
+                except Exception as E:
+                    self.error(E)
+                    self.dtd_errors.append("The RNG at {0} could not be downloaded ({1})".format(rng_path, E))
+                    yield False
+                    continue
             elif not os.path.isfile(rng_path):
                 self.dtd_errors.append("No RNG was found at " + rng_path)
                 yield False
@@ -446,48 +562,42 @@ class CTSText_TestUnit(TESTUnit):
             for status in self.run_rng(rng_path):
                 yield status
 
+    def xml_model_uris(self):
+        """ Find the RNG declared by the xml-model processing instructions of the file
+
+        :return: URL of remote RNG and absolute path of local ones
+        :rtype: [str]
+        """
+        xml_dir = os.path.dirname(os.path.abspath(self.path))
+        uris = []
+        for rng in self.processing_instructions("xml-model"):
+            uri = rng.attrib["href"]
+            if validators.url(uri):
+                uris.append(uri)
+            else:
+                uris.append(os.path.abspath(os.path.join(xml_dir, uri)))
+        return uris
+
+    def xml_models(self):
+        """ Find the RNG declared by the xml-model processing instructions of the file
+
+        :return: Path of each RNG, remote ones being downloaded
+        :rtype: [str]
+        """
+        return [
+            self.get_remote_rng(uri) if validators.url(uri) else uri
+            for uri in self.xml_model_uris()
+        ]
+
     def get_remote_rng(self, url):
         """ Given a valid URL, downloads the RNG from the given URL and returns the filepath and name
 
         :param url: the URL of the RNG
         :return: filenpath and name where the RNG was saved
-        """
-        # If the file is remote, have a file-system approved name
-        # The md5 hash seems like a good option
-        sha = md5(url.encode()).hexdigest()
-
-        # We have a name for the rng file but also for the in-download marker
-        # Note : we might want to add a os.makedirs somewhere with exists=True
-        makedirs(".rngs", exist_ok=True)
-        stable_local = os.path.join(".rngs", sha + ".rng")
-        stable_local_downloading = os.path.join(".rngs", sha + ".rng-indownload")
-
-        # check if the stable_local rng already exists
-        # if it does, immediately run the rng test and move to the next rng in the file
-        if os.path.exists(stable_local):
-            return stable_local
-        # We check if the in-download proof file is shown here
-        # Until the in-download marker is there, we need to wait
-        elif os.path.exists(stable_local_downloading):
-            # Wait up to 30 secs ?
-            # Have it as a constant that could be changed in environment variables ?
-            waited = self.timeout
-            while not os.path.exists(stable_local):
-                time.sleep(1)
-                waited -= 1
-                if waited < 0:
-                    # Maybe we can wait more ?
-                    raise EnvironmentError("The download of the RNG took too long")
-        else:
-            with open(stable_local_downloading, "w") as f:
-                f.write("Downloading...")
-            data = requests.get(url)
-            data.raise_for_status()
-            with open(stable_local_downloading, "w") as f:
-                f.write(data.text)
-            shutil.move(stable_local_downloading, stable_local)
 
-        return stable_local
+        .. note:: See HookTest.rng.fetch : RNG are stored in the schema directory of the HookTest cache
+        """
+        return HookTest.rng.fetch(url, self.timeout)
 
     def epidoc(self):
         """ Check the original file against Epidoc rng through a java pipe
@@ -509,41 +619,65 @@ class CTSText_TestUnit(TESTUnit):
         for status in self.run_rng(self.rng):
             yield status
 
+    def release(self):
+        """ Release the parsed file and the objects built on it
+        """
+        self.Text = None
+        self.__references = (None, None)
+        self.document.release()
+
+    def needs_tree(self, test):
+        """ Check whether a test uses the parsed file. Once the last test which does is done, the tree is released
+
+        :param test: Name of the test
+        :type test: str
+        :rtype: bool
+        """
+        if test in CTSText_TestUnit.untied:
+            return False
+        elif test == self.scheme:
+            # Jing validates the file in another process
+            return HookTest.rng.SETTINGS["engine"] == "lxml"
+        return True
+
+    def references(self):
+        """ Get the reference enumeration of the text, shared by passages and unique_passage
+
+        :rtype: References
+        """
+        text, references = self.__references
+        if text is not self.Text:
+            references = References(self.Text)
+            self.__references = (self.Text, references)
+        return references
+
     def passages(self):
         """  Check that passages are available at each level. On top of that, it checks for forbidden characters \
         and duplicate in references
 
+        .. note:: Levels are enumerated in a single walk through the citation scheme, see References
         """
         if self.Text and self.Text.citation.refsDecl:
             citations = [c.name for c in self.Text.citation]
             for i in range(0, len(self.Text.citation)):
                 try:
-                    with warnings.catch_warnings(record=True) as warning_record:
-                        # Cause all warnings to always be triggered.
-                        warnings.simplefilter("always")
-                        passages = self.Text.getValidReff(level=i + 1, _debug=True)
-                        ids = [str(ref).split(".", i)[-1] for ref in passages]
-                        space_in_passage = TESTUnit.FORBIDDEN_CHAR.search("".join(ids))
-                        with_dot = [str(ref) for ref in passages if ref and ref.depth > i + 1]
-                        len_passage = len(passages)
-                        status = len_passage > 0
-                        self.log(str(len_passage) + " found")
-                        self.citation.append((i, len_passage, citations[i]))
-                        for record in warning_record:
-                            if record.category == DuplicateReference:
-                                self.duplicates += sorted(str(record.message).split(", "))
-                            if record.category == EmptyReference:
-                                self.empties += [str(record.message)]
-                        if space_in_passage and space_in_passage is not None:
-                            self.forbiddens += ["'{}'".format(n)
-                                                for ref, n in zip(ids, passages)
-                                                if TESTUnit.FORBIDDEN_CHAR.search(ref)]
-                        if with_dot and with_dot is not None:
-                            self.forbiddens += ["'{}'".format(n) for n in with_dot if "'{}'".format(n) not in self.forbiddens]
-                        if status is False:
-                            yield status
-                            break
+                    level = self.references().level(i + 1)
+                    passages = level.references
+                    len_passage = len(passages)
+                    status = len_passage > 0
+                    self.log(str(len_passage) + " found")
+                    self.citation.append((i, len_passage, citations[i]))
+                    self.duplicates += level.duplicates
+                    if level.empties:
+                        self.empties += [
+                            "{} empty reference(s) at citation level {}".format(len(level.empties), i + 1)
+                        ]
+                    self.forbiddens += ["'{}'".format(n) for n in level.forbiddens]
+                    self.forbiddens += ["'{}'".format(n) for n in level.dotted if "'{}'".format(n) not in self.forbiddens]
+                    if status is False:
                         yield status
+                        break
+                    yield status
                 except Exception as E:
                     self.error(E)
                     self.log("Error when searching passages at level {0}".format(i + 1))
@@ -593,19 +727,7 @@ class CTSText_TestUnit(TESTUnit):
         """
         try:
             # Checking for duplicate
-            xpaths = [
-                self.Text.xml.xpath(
-                    MyCapytain.common.reference._capitains_cts.REFERENCE_REPLACER.sub(
-                        r"\1",
-                        citation.refsDecl
-                    ),
-                    namespaces=TESTUnit.NS
-                )
-                for citation in self.Text.citation
-            ]
-            nodes = [element for xpath in xpaths for element in xpath]
-            bad_citation = len(nodes) == len(set(nodes))
-            if not bad_citation:
+            if self.references().collisions():
                 self.log("Some node are found twice")
                 yield False
             else:
@@ -618,25 +740,10 @@ class CTSText_TestUnit(TESTUnit):
         """
         if self.xml is not None:
             if self.guidelines == "2.tei":
-                urns = self.xml.xpath(
-                    "//tei:text/tei:body[starts-with(@n, 'urn:cts:')]",
-                    namespaces=TESTUnit.NS)
-                urns += self.xml.xpath(
-                    "//tei:text[starts-with(@xml:base, 'urn:cts:')]",
-                    namespaces=TESTUnit.NS)
+                urns = TEI_URN(self.xml) + TEI_BASE_URN(self.xml)
             else:
-                urns = self.xml.xpath(
-                    "//tei:body/tei:div[@type='edition' and starts-with(@n, 'urn:cts:')]",
-                    namespaces=TESTUnit.NS
-                )
-                urns += self.xml.xpath(
-                    "//tei:body/tei:div[@type='translation' and starts-with(@n, 'urn:cts:')]",
-                    namespaces=TESTUnit.NS
-                )
-                urns += self.xml.xpath(
-                    "//tei:body/tei:div[@type='commentary' and starts-with(@n, 'urn:cts:')]",
-                    namespaces=TESTUnit.NS
-                )
+                # Editions first, then translations and commentaries
+                urns = sorted(EPIDOC_URN(self.xml), key=lambda node: EPIDOC_TYPES.index(node.get("type")))
             status = len(urns) > 0
             if status:
                 logs = urns[0].get("n")
@@ -677,13 +784,41 @@ class CTSText_TestUnit(TESTUnit):
         else:
             yield False
 
+    @classmethod
+    def words(cls, node):
+        """ Count the words of a node, leaving out the text of the UNCOUNTED elements
+
+        Gives the number of words of the plain text export of the node excluding tei:note and tei:teiHeader, text nodes \
+        being joined by spaces in the export. Text nodes are counted one at a time : neither the export nor the list of \
+        all its words are built, and the memory used only depends on the depth of the tree and the largest text node.
+
+        :param node: Node to count the words of
+        :type node: lxml.etree._Element
+        :rtype: int
+        """
+        if node.tag in UNCOUNTED:
+            return 0
+        count = tokens(node.text)
+        children = [iter(node)]
+        while children:
+            child = next(children[-1], None)
+            if child is None:
+                children.pop()
+                continue
+            # The tail of a child is a text node of its parent
+            count += tokens(child.tail)
+            if isinstance(child.tag, str) and child.tag not in UNCOUNTED:
+                count += tokens(child.text)
+                children.append(iter(child))
+        return count
+
     def count_words(self):
         """ Count words in a file
         """
         status = False
         if self.test_status["passages"]:
-            text = self.Text.export(Mimetypes.PLAINTEXT, exclude=["tei:note", "tei:teiHeader"])
-            self.count = len(type(self).splitter.findall(text))
+            # Parsed again when the test is run on its own after the release of the tree
+            self.count = type(self).words(self.document.text().resource)
 
             self.log("{} has {} words".format(self.urn, self.count))
             status = self.count > 0
@@ -693,15 +828,9 @@ class CTSText_TestUnit(TESTUnit):
         """ Tests to make sure an xml:lang element is on the correct node
         """
         if self.guidelines == "2.epidoc":
-            urns_holding_node = self.xml.xpath(
-                "//tei:text/tei:body/tei:div"
-                "[@type='edition' or @type='translation' or @type='commentary']"
-                "[starts-with(@n, 'urn:cts:')]",
-                namespaces=TESTUnit.NS
-            )
+            urns_holding_node = EPIDOC_LANGUAGE(self.xml)
         elif self.guidelines == "2.tei":
-            urns_holding_node = self.xml.xpath("//tei:text/tei:body[starts-with(@n, 'urn:cts:')]", namespaces=TESTUnit.NS) + \
-                self.xml.xpath("//tei:text[starts-with(@xml:base, 'urn:cts:')]", namespaces=TESTUnit.NS)
+            urns_holding_node = TEI_URN(self.xml) + TEI_BASE_URN(self.xml)
 
         try:
             self.lang = urns_holding_node[0].get('{http://www.w3.org/XML/1998/namespace}lang')
@@ -713,44 +842,67 @@ class CTSText_TestUnit(TESTUnit):
         else:
             yield True
 
-    def test(self, scheme, guidelines, rng=None, inventory=None):
+    def test(self, scheme, guidelines, rng=None, inventory=None, rng_last=False):
         """ Test a file with various checks
 
         :param scheme: Test with TEI DTD
         :type scheme: str
-        :param inventory: URNs to be matched against
+        :param inventory: URNs to be matched against. Without inventory, the inventory test is left to the caller
         :type inventory: list
+        :param rng_last: Run the RelaxNG validation last, and only if every other test passed
+        :type rng_last: bool
         :returns: Iterator containing human readable test name, boolean status and logs
         :rtype: iterator(str, bool, list(str))
+
+        .. note:: The RelaxNG validation is started in the background once the file is known to be well-formed XML, \
+        and reported after the other tests. Files which are not parsable are failed without starting a validator
         """
+        tests = [] + CTSText_TestUnit.tests
         if inventory is not None:
             self.inv = inventory
-        tests = [] + CTSText_TestUnit.tests
+        elif "inventory" in tests:
+            tests.remove("inventory")
         if self.countwords:
             tests.append("count_words")
 
-        if scheme in["tei", "epidoc", "auto_rng", "local_file"]:
-            tests = [scheme] + tests
+        validated = scheme in ["tei", "epidoc", "auto_rng", "local_file"]
+        if validated:
+            tests.append(scheme)
 
         self.scheme = scheme
         self.guidelines = guidelines
         self.rng = rng
         if environ.get("HOOKTEST_DEBUG", False):
             print("Starting %s " % self.path)
-        i = 0
-        for test in tests:
+        started = False
+        # Position of the last test which uses the parsed file
+        last = max([index for index, test in enumerate(tests) if self.needs_tree(test)] or [-1])
+        broken = False
+        for index, test in enumerate(tests):
 
             # Show the logs and return the status
 
+            if broken and not (test == scheme and started):
+                # Validations already started are still reported
+                self.test_status[test] = False
+                yield (CTSText_TestUnit.readable[test], False, [])
+                continue
+
             if environ.get("HOOKTEST_DEBUG", False):
                 print("\t Testing %s " % test)
-            status = False not in [status for status in getattr(self, test)()]
+            if test == scheme and rng_last and False in self.test_status.values():
+                self.log("RelaxNG validation skipped because other tests failed")
+                status = False
+            else:
+                status = False not in [status for status in getattr(self, test)()]
             self.test_status[test] = status
+            if test == "parsable" and status and validated and not rng_last:
+                self.start_rng()
+                started = True
             yield (CTSText_TestUnit.readable[test], status, self.logs)
-            if test in self.breaks and not status:
-                for t in tests[i + 1:]:
-                    self.test_status[t] = False
-                    yield (CTSText_TestUnit.readable[t], False, [])
-                break
             self.flush()
-            i += 1
+            if test in self.breaks and not status:
+                broken = True
+            if index == last or (broken and index < last):
+                # The remaining tests use the URN or validate the file in another process
+                self.release()
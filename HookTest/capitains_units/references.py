@@ -0,0 +1,147 @@
+from lxml import etree
+from MyCapytain.common.constants import XPATH_NAMESPACES
+from MyCapytain.common.reference import CtsReference, CtsReferenceSet
+from MyCapytain.common.reference._capitains_cts import REFERENCE_REPLACER
+
+from HookTest.units import TESTUnit
+
+
+class Level(object):
+    """ References found at one citation level of a text
+
+    :param depth: Depth of the level, starting at 1
+    :type depth: int
+    :param citation: Citation of the level
+    :type citation: MyCapytain.common.reference.Citation
+    :param passages: References of the level, in document order
+    :type passages: [str]
+
+    :ivar references: References of the level, as returned by CapitainsCtsText.getValidReff
+    :type references: CtsReferenceSet
+    :ivar duplicates: References found more than once
+    :type duplicates: [str]
+    :ivar empties: References with an empty member
+    :type empties: [str]
+    :ivar forbiddens: References whose member at this level has a forbidden character
+    :type forbiddens: [str]
+    :ivar dotted: References made of more members than the level depth, such as 1.a.b at the second level
+    :type dotted: [str]
+    """
+    def __init__(self, depth, citation, passages):
+        self.depth = depth
+        self.citation = citation
+        self.references = CtsReferenceSet(
+            [CtsReference(passage) for passage in passages], citation=citation, level=depth
+        )
+        seen, duplicates = set(), set()
+        for passage in passages:
+            if passage in seen:
+                duplicates.add(passage)
+            else:
+                seen.add(passage)
+        self.duplicates = sorted(duplicates)
+        self.empties = [passage for passage in passages if passage.rstrip('.') != passage or passage == '']
+        self.forbiddens = [
+            str(reference) for reference in self.references
+            if TESTUnit.FORBIDDEN_CHAR.search(str(reference).split(".", depth - 1)[-1])
+        ]
+        self.dotted = [str(reference) for reference in self.references if reference and reference.depth > depth]
+
+
+class References(object):
+    """ Enumerate the references of a text level by level, in a single walk through its citation scheme
+
+    CapitainsCtsText.getValidReff(level=n) finds the references of every level up to n before returning the last one. \
+    Going through the levels one after the other, each level is built from the references of the level above it, so \
+    that each XPath of the walk is evaluated once. The XPath of a level is compiled once, the references of the \
+    level above being given as variables. The references, duplicates and empty references of each level are the ones \
+    getValidReff(level, _debug=True) returns and warns about. The nodes found at each level are kept to check that \
+    levels do not collide.
+
+    :param text: Text to enumerate
+    :type text: MyCapytain.resources.texts.local.capitains.cts.CapitainsCtsText
+    """
+    def __init__(self, text):
+        self.xml = text.textObject.xml
+        self.citations = [citation for citation in text.citation.root]
+        self.__nodes = []
+        self.__levels = []
+        self.__passages = [[]]
+
+    def level(self, depth):
+        """ Get the references of a citation level, walking down the levels above it when they were not visited yet
+
+        :param depth: Depth of the level, starting at 1
+        :type depth: int
+        :returns: References of the level. Like getValidReff, raises an exception when the level or a level above \
+        has no references or a reference missing its attribute
+        :rtype: Level
+        """
+        while len(self.__levels) < depth:
+            citation = self.citations[len(self.__levels)]
+            passages = self.__passages
+            attribute = citation.attribute.replace("xml:", "{http://www.w3.org/XML/1998/namespace}")
+            xpath = self.compile(citation, len(self.__levels) + 1)
+            found = [(refs, node) for refs in passages for node in self.find(xpath, citation, refs)]
+            passages = [refs + [node.get(attribute)] for refs, node in found]
+            # A node found under several duplicate references is the same node of the level
+            self.__nodes.append(set(node for _, node in found))
+            if len(passages) == 0:
+                raise KeyError("Unknown reference {}".format(None))
+            self.__levels.append(Level(len(self.__levels) + 1, citation, [".".join(passage) for passage in passages]))
+            self.__passages = passages
+        return self.__levels[depth - 1]
+
+    @staticmethod
+    def compile(citation, depth):
+        """ Compile the XPath of a citation level, the references of the levels above being variables ($r1, $r2...)
+
+        :param citation: Citation of the level
+        :type citation: MyCapytain.common.reference.Citation
+        :param depth: Depth of the level, starting at 1
+        :type depth: int
+        :returns: Compiled XPath, None when the refsDecl does not have one placeholder per level
+        :rtype: etree.XPath
+        """
+        if len(REFERENCE_REPLACER.findall(citation.refsDecl)) != depth:
+            return None
+        members = iter(range(1, depth + 1))
+
+        def replace(match):
+            member = next(members)
+            if member == depth:
+                return match.group(1)
+            return "{0}=$r{1}".format(match.group(1), member)
+
+        return etree.XPath(REFERENCE_REPLACER.sub(replace, citation.refsDecl), namespaces=XPATH_NAMESPACES)
+
+    def find(self, xpath, citation, refs):
+        """ Find the nodes of a citation level below the given references
+
+        :param xpath: Compiled XPath of the level
+        :type xpath: etree.XPath
+        :param citation: Citation of the level
+        :type citation: MyCapytain.common.reference.Citation
+        :param refs: Members of the reference of the level above
+        :type refs: [str]
+        :rtype: [lxml.etree._Element]
+        """
+        if xpath is None or any("'" in ref for ref in refs):
+            # Same XPath as getValidReff, including its failures
+            return self.xml.xpath(citation.fill(refs + [None]), namespaces=XPATH_NAMESPACES)
+        return xpath(self.xml, **{"r{0}".format(member): ref for member, ref in enumerate(refs, 1)})
+
+    def collisions(self):
+        """ Check whether a node is found at several citation levels (eg. Where text:1 would be the same node as \
+        text:1.1), using the nodes of the walk through every level
+
+        :returns: Whether levels collide. Like level, raises an exception when a level has no references
+        :rtype: bool
+        """
+        self.level(len(self.citations))
+        seen = set()
+        for nodes in self.__nodes:
+            if not seen.isdisjoint(nodes):
+                return True
+            seen |= nodes
+        return False
@@ -0,0 +1,119 @@
+class UrnIndex(object):
+    """ URNs of the texts described by the metadata files, indexed by textgroup, work and version
+
+    Checking that a text is described by the metadata is a lookup per URN member instead of a scan of every URN. \
+    Texts are checked against the index with :meth:`find`, which keeps track of the texts without metadata and of the \
+    metadata entries found so far.
+
+    :ivar textgroups: Works of each (namespace, textgroup), versions of each work, URN and metadata file of each version
+    :type textgroups: dict
+    :ivar orphans: Texts whose URN is not in the index, with their URN
+    :type orphans: [(str, str)]
+    """
+    def __init__(self):
+        self.textgroups = {}
+        self.orphans = []
+        self.__others = {}
+        self.__found = set()
+
+    @staticmethod
+    def key(urn):
+        """ Split a text URN into the members it is indexed by
+
+        :param urn: URN of a text, such as urn:cts:latinLit:phi1294.phi002.perseus-lat2
+        :type urn: str
+        :returns: (namespace, textgroup), work and version, or None when the URN is not made of exactly these members
+        :rtype: ((str, str), str, str)
+        """
+        parts = urn.split(":")
+        if len(parts) != 4 or parts[0] != "urn" or parts[1] != "cts":
+            return None
+        members = parts[3].split(".")
+        if len(members) != 3:
+            return None
+        return (parts[2], members[0]), members[1], members[2]
+
+    def add(self, urn, source=None):
+        """ Add the URN of a text described by a metadata file
+
+        :param urn: URN of the text
+        :type urn: str
+        :param source: Metadata file describing the text
+        :type source: str
+        """
+        key = UrnIndex.key(urn)
+        if key is None:
+            # Kept for an exact match
+            self.__others[urn] = source
+        else:
+            textgroup, work, version = key
+            self.textgroups.setdefault(textgroup, {}).setdefault(work, {})[version] = (urn, source)
+
+    def get(self, urn):
+        """ Get the metadata file describing a text
+
+        :param urn: URN of the text
+        :type urn: str
+        :returns: Metadata file, None when the text is not described
+        :rtype: str
+        :raises KeyError: When the URN is not in the index
+        """
+        key = UrnIndex.key(urn)
+        if key is None:
+            return self.__others[urn]
+        textgroup, work, version = key
+        indexed, source = self.textgroups[textgroup][work][version]
+        if indexed != urn:
+            raise KeyError(urn)
+        return source
+
+    def __contains__(self, urn):
+        try:
+            self.get(urn)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.__others) + sum(
+            len(versions) for works in self.textgroups.values() for versions in works.values()
+        )
+
+    def __iter__(self):
+        for works in self.textgroups.values():
+            for versions in works.values():
+                for urn, source in versions.values():
+                    yield urn
+        for urn in self.__others:
+            yield urn
+
+    def find(self, urn, text):
+        """ Check that a text is described by the metadata, recording it as found or as an orphan
+
+        :param urn: URN of the text
+        :type urn: str
+        :param text: Path or name of the text
+        :type text: str
+        :rtype: bool
+        """
+        if urn in self:
+            self.__found.add(urn)
+            return True
+        self.orphans.append((text, urn))
+        return False
+
+    def missing(self):
+        """ Metadata entries for which no text was found
+
+        :returns: URN and metadata file of each entry, ordered by URN
+        :rtype: [(str, str)]
+        """
+        missing = [
+            (urn, source)
+            for works in self.textgroups.values()
+            for versions in works.values()
+            for urn, source in versions.values()
+            if urn not in self.__found
+        ]
+        missing += [(urn, source) for urn, source in self.__others.items() if urn not in self.__found]
+        return sorted(missing)
@@ -1,7 +1,10 @@
 import argparse
 import sys
 import HookTest.test
+import HookTest.rng
 import HookTest.build
+import HookTest.cache
+import HookTest.executors
 import os
 
 
@@ -37,7 +40,25 @@ def parse_args(args):
 
     parser.add_argument("path", help="Path containing the repository")
 
-    parser.add_argument('-w', "--workers", type=int, help='Number of workers (processes) to be used', default=1)
+    parser.add_argument('-w', "--workers", type=int, help='Number of workers to be used', default=1)
+
+    parser.add_argument(
+        "--executor", choices=HookTest.executors.EXECUTORS, default="process",
+        help="Workers running the tests : processes, threads (enough when Jing or lxml parsing dominates) or serial "
+             "in the main process, for profiling (Default: process)"
+    )
+
+    parser.add_argument(
+        "--recycle", type=int, default=None,
+        help="Number of tasks after which a worker process is replaced by a new one. A task is a chunk of up to 16 "
+             "files, small files being grouped (Default: never)"
+    )
+
+    parser.add_argument(
+        "--max-memory", dest="max_memory", type=float, default=None,
+        help="Resident memory in MB above which the worker processes are replaced once their running tasks are done "
+             "(Default: no limit)"
+    )
 
     parser.add_argument('-s', "--scheme",
                         help="Scheme to test. 'ignore' test will ignore RNG.",
@@ -62,6 +83,11 @@ def parse_args(args):
         action="store_true",
         default=False
     )
+    parser.add_argument(
+        "--large-file", dest="large_file", type=float, default=10,
+        help="Size in MB above which texts are parsed with a huge tree parser, without keeping their content next "
+             "to the tree (Default: 10)"
+    )
     parser.add_argument(
         "--console", help="Console Mode",
         default=False, action="store", const="true",
@@ -79,6 +105,59 @@ def parse_args(args):
         help="Maximum time to be used on RelaxNG tests. If exceeded, test fails", type=int, default=30
     )
 
+    parser.add_argument(
+        "--rng-daemon", dest="rng_daemon",
+        help="Validate RelaxNG through one persistent Jing process per worker instead of one java call per file",
+        action="store_true", default=False
+    )
+
+    parser.add_argument(
+        "--rng-batch", dest="rng_batch", type=int, default=1,
+        help="Number of texts validated by a single Jing call. With the auto scheme, texts are grouped by RNG first"
+    )
+
+    parser.add_argument(
+        "--rng-last", dest="rng_last", action="store_true", default=False,
+        help="Validate against RelaxNG only the texts which pass every other test, for faster feedback"
+    )
+
+    parser.add_argument(
+        "--rng-slots", dest="rng_slots", type=int, default=None,
+        help="Maximum number of Jing processes running at the same time across workers. Python checks keep using "
+             "every worker (Default: as many as the available memory holds, 512MB each)"
+    )
+
+    parser.add_argument(
+        "--rng-max-errors", dest="rng_max_errors", type=int, default=100,
+        help="Number of RelaxNG errors after which the validation of a text is stopped, 0 for no limit (Default: 100)"
+    )
+
+    parser.add_argument(
+        "--rng-engine", dest="rng_engine", choices=HookTest.rng.ENGINES, default="jing",
+        help="Validate RelaxNG with Jing or in-process with lxml (falls back to Jing for schemas lxml cannot compile)"
+    )
+
+    parser.add_argument(
+        "--no-rng-cache", dest="rng_cache", action="store_false", default=True,
+        help="Validate every file against RelaxNG, even the ones which did not change since a previous run"
+    )
+
+    parser.add_argument(
+        "--cache-dir", dest="cache_dir", default=None,
+        help="Directory of the HookTest cache (Default: $XDG_CACHE_HOME/hooktest or ~/.cache/hooktest)"
+    )
+
+    parser.add_argument(
+        "--offline", action="store_true", default=False,
+        help="Never download remote RNG : texts whose RNG is not in the cache directory fail right away"
+    )
+
+    parser.add_argument(
+        "--catalog", dest="catalogs", action="append", default=None,
+        help="JSON file mapping remote RNG URLs to local RNG paths (relative to the file), used instead of downloads. "
+             "Can be repeated"
+    )
+
     parser.add_argument(
         "--hookUI", dest="from_travis_to_hook",
         help="Send results to a Hook UI endpoint",
@@ -103,6 +182,9 @@ def parse_args(args):
         args.console = True
     if args.verbose is None:
         args.verbose = 10
+    args.large_file = int(args.large_file * 1024 * 1024)
+    if args.max_memory:
+        args.max_memory = int(args.max_memory * 1024 * 1024)
     return args
 
 
@@ -143,9 +225,13 @@ def parse_args_build(args):
                         action="store_true", default=False)
     parser.add_argument(
         "--workers",
-        help="The number of processes to use for extracting plain text.",
+        help="The number of workers to use for extracting plain text.",
         default=3
     )
+    parser.add_argument(
+        "--executor", choices=HookTest.executors.EXECUTORS, default="process",
+        help="Workers extracting plain text : processes, threads or serial in the main process (Default: process)"
+    )
 
     arguments = parser.parse_args(args)
 
@@ -162,5 +248,38 @@ def cmd_build():
         sys.exit(message)
 
 
+def parse_args_warmup(args):
+    """ Parsing function. Written to support unit test
+
+    :param args: List of command line argument
+    :return: Parsed argument
+    """
+    parser = argparse.ArgumentParser(
+        prog='hooktest-warmup',
+        description=" Prepares the JVM used by HookTest for faster Jing start ups : builds a class data sharing archive "
+                    "of Jing and saves the start up options supported by the local java"
+    )
+    parser.add_argument(
+        "--cache-dir", dest="cache_dir", default=None,
+        help="Directory of the HookTest cache (Default: $XDG_CACHE_HOME/hooktest or ~/.cache/hooktest)"
+    )
+    return parser.parse_args(args)
+
+
+def cmd_warmup():
+    """ Run locally the software. Should not be called outside of a python cmd.py call
+    """
+    args = parse_args_warmup(sys.argv[1:])
+    directory = os.path.join(args.cache_dir or HookTest.cache.DIRECTORY, "jvm")
+    try:
+        settings = HookTest.rng.warmup(directory)
+    except OSError as E:
+        sys.exit("The JVM could not be prepared : {0}".format(E))
+    print("Class data sharing archive : {0}".format("yes" if settings["share"] else "not supported by this JVM"))
+    print("Start up options : {0}".format(" ".join(settings["options"]) or "none"))
+    print("Settings saved in {0}".format(directory))
+    sys.exit(0)
+
+
 if __name__ == '__main__':
     cmd()
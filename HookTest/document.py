@@ -0,0 +1,140 @@
+import os.path
+
+from lxml import etree
+from MyCapytain.resources.texts.local.capitains.cts import CapitainsCtsText
+
+
+#: Parser shared by every check. Entities and network access are disabled
+PARSER = etree.XMLParser(no_network=True, resolve_entities=False)
+#: Parser of the large files, lifting the limits of libxml2 on the size of text nodes and the depth of the tree
+HUGE_PARSER = etree.XMLParser(no_network=True, resolve_entities=False, huge_tree=True)
+#: Size in bytes above which a file is large : it is parsed with HUGE_PARSER, its content not being kept
+LARGE_FILE = 10 * 1024 * 1024
+
+#: Documents created and files parsed in the current process since the last call to :func:`stats`
+STATS = {
+    "documents": 0,
+    "parses": 0
+}
+
+
+def stats():
+    """ Get and reset the parsing counters of the current process
+
+    :returns: Number of documents and of parses. Each document should be parsed at most once
+    :rtype: dict
+    """
+    current = dict(STATS)
+    for key in STATS:
+        STATS[key] = 0
+    return current
+
+
+class Document(object):
+    """ XML file read and parsed at most once, shared by the tests of a unit
+
+    :param path: Path of the file
+    :type path: str
+    :param large_file: Size in bytes above which the file is large (Default : LARGE_FILE)
+    :type large_file: int
+
+    :ivar xml: Parsed file, None until :meth:`parse` is called
+    :type xml: lxml.etree._ElementTree
+    :ivar parses: Number of times the file was parsed
+    :type parses: int
+    """
+    def __init__(self, path, large_file=LARGE_FILE):
+        self.path = path
+        self.large_file = large_file
+        self.xml = None
+        self.parses = 0
+        self.__raw = None
+        self.__failure = None
+        self.__text = (None, None)
+        self.__size = None
+        STATS["documents"] += 1
+
+    @property
+    def size(self):
+        """ Size of the file in bytes, 0 when it cannot be read
+
+        :rtype: int
+        """
+        if self.__size is None:
+            try:
+                self.__size = os.path.getsize(self.path)
+            except OSError:
+                self.__size = 0
+        return self.__size
+
+    @property
+    def large(self):
+        """ Whether the file is larger than large_file
+
+        :rtype: bool
+        """
+        return self.large_file is not None and self.size > self.large_file
+
+    @property
+    def strategy(self):
+        """ Name of the way the file is parsed : "tree" when it is parsed from its content, "huge" when it is parsed \
+        with HUGE_PARSER straight from the file
+
+        :rtype: str
+        """
+        if self.large:
+            return "huge"
+        return "tree"
+
+    @property
+    def raw(self):
+        """ Content of the file
+
+        :rtype: bytes
+        """
+        if self.__raw is None:
+            with open(self.path, "rb") as f:
+                self.__raw = f.read()
+        return self.__raw
+
+    def parse(self):
+        """ Parse the file, unless it was already done. A file which could not be parsed is not parsed again : the \
+        same exception is raised
+
+        :returns: Parsed file
+        :rtype: lxml.etree._ElementTree
+        """
+        if self.xml is None:
+            if self.__failure is not None:
+                raise self.__failure
+            self.parses += 1
+            STATS["parses"] += 1
+            try:
+                if self.large:
+                    # The content of large files is not kept next to their tree
+                    self.xml = etree.parse(self.path, HUGE_PARSER)
+                else:
+                    # The root tree keeps the processing instructions of the prolog
+                    self.xml = etree.fromstring(self.raw, PARSER, base_url=self.path).getroottree()
+            except Exception as E:
+                self.__failure = E
+                raise
+        return self.xml
+
+    def text(self):
+        """ Get the MyCapytain text of the parsed file, built once per tree
+
+        :rtype: CapitainsCtsText
+        """
+        tree, text = self.__text
+        if tree is not self.parse():
+            text = CapitainsCtsText(resource=self.xml.getroot())
+            self.__text = (self.xml, text)
+        return text
+
+    def release(self):
+        """ Drop the parsed file and its text to free their memory. The file is parsed again if needed
+        """
+        self.xml = None
+        self.__raw = None
+        self.__text = (None, None)
@@ -0,0 +1,69 @@
+from multiprocessing.pool import Pool, ThreadPool
+
+
+#: Available executors, from the most isolated to the cheapest to start
+EXECUTORS = ["process", "thread", "serial"]
+
+
+class SerialPool(object):
+    """ Pool running its tasks one after the other in the calling process, when it is iterated
+
+    It has the part of the interface of multiprocessing.pool.Pool used by HookTest : nothing is pickled and every task \
+    runs in the main thread, where profilers and debuggers see it.
+
+    :param processes: Ignored, tasks are run one at a time
+    :param initializer: Function called once before the first task
+    :param initargs: Arguments of the initializer
+    """
+    def __init__(self, processes=None, initializer=None, initargs=()):
+        if initializer is not None:
+            initializer(*initargs)
+
+    def imap_unordered(self, func, iterable):
+        """ Run the tasks lazily, in order
+
+        :param func: Function running a task
+        :param iterable: Arguments of the tasks
+        :returns: Results of the tasks
+        """
+        for task in iterable:
+            yield func(task)
+
+    def close(self):
+        pass
+
+    def join(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+def executor(name, processes, initializer=None, initargs=(), maxtasksperchild=None):
+    """ Create a pool of workers
+
+    :param name: One of EXECUTORS. Processes do not share the GIL, threads are enough when the workers mostly wait \
+    for Jing or parse with lxml, and serial runs every task in the calling process
+    :type name: str
+    :param processes: Number of workers
+    :type processes: int
+    :param initializer: Function called once by each worker before its first task
+    :param initargs: Arguments of the initializer
+    :type initargs: tuple
+    :param maxtasksperchild: Number of tasks after which a worker process is replaced. Only used by processes
+    :type maxtasksperchild: int
+    :returns: Pool usable as a context manager, with imap_unordered, close and join
+    :raises ValueError: When the executor is unknown
+    """
+    if name == "process":
+        return Pool(
+            processes=processes, initializer=initializer, initargs=initargs, maxtasksperchild=maxtasksperchild
+        )
+    elif name == "thread":
+        return ThreadPool(processes=processes, initializer=initializer, initargs=initargs)
+    elif name == "serial":
+        return SerialPool(processes=processes, initializer=initializer, initargs=initargs)
+    raise ValueError("Unknown executor {0}, expected one of {1}".format(name, ", ".join(EXECUTORS)))
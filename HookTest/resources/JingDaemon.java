@@ -0,0 +1,88 @@
+import java.io.BufferedReader;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.util.LinkedHashMap;
+import java.util.Map;
+
+import com.thaiopensource.util.PropertyMapBuilder;
+import com.thaiopensource.validate.ValidateProperty;
+import com.thaiopensource.validate.ValidationDriver;
+import com.thaiopensource.validate.auto.AutoSchemaReader;
+import com.thaiopensource.validate.prop.rng.RngProperty;
+import com.thaiopensource.xml.sax.ErrorHandlerImpl;
+import org.xml.sax.SAXException;
+
+/**
+ * Long-lived Jing validator used by HookTest.rng.JingDaemon
+ *
+ * Each line read on the standard input is a request made of a schema path, an instance path and the hash of the
+ * schema with its modules (see HookTest.rng.schema_digest) separated by tabulations. The answer is exactly what
+ * `java -jar jing.jar schema instance` would print on its standard output, followed by a line starting with END and
+ * holding the status of the validation and whether the compiled schema came from the cache (HIT) or had to be
+ * compiled (MISS).
+ */
+public class JingDaemon {
+    static final String END = "\u0000HOOKTEST-END";
+    static final int CACHE_SIZE = 16;
+
+    /**
+     * Drivers holding a compiled schema, keyed by schema path and hash, least recently used first
+     */
+    static final Map<String, ValidationDriver> DRIVERS = new LinkedHashMap<String, ValidationDriver>(16, 0.75f, true) {
+        @Override
+        protected boolean removeEldestEntry(Map.Entry<String, ValidationDriver> eldest) {
+            return size() > CACHE_SIZE;
+        }
+    };
+
+    public static void main(String[] args) throws IOException {
+        BufferedReader requests = new BufferedReader(new InputStreamReader(System.in, "UTF-8"));
+        System.out.println(END + " READY");
+        System.out.flush();
+
+        String request;
+        while ((request = requests.readLine()) != null) {
+            String[] paths = request.split("\t", 3);
+            String status = "INVALID";
+            String cache = "HIT";
+            ErrorHandlerImpl eh = null;
+            try {
+                String key = paths[0] + "\t" + paths[2];
+                ValidationDriver driver = (ValidationDriver) DRIVERS.get(key);
+                if (driver == null) {
+                    cache = "MISS";
+                    // Same setup as com.thaiopensource.relaxng.util.Driver without options
+                    eh = new ErrorHandlerImpl(System.out);
+                    PropertyMapBuilder properties = new PropertyMapBuilder();
+                    properties.put(ValidateProperty.ERROR_HANDLER, eh);
+                    RngProperty.CHECK_ID_IDREF.add(properties);
+                    driver = new ValidationDriver(properties.toPropertyMap(), new AutoSchemaReader());
+                    if (driver.loadSchema(ValidationDriver.uriOrFileInputSource(paths[0]))) {
+                        DRIVERS.put(key, driver);
+                    } else {
+                        driver = null;
+                    }
+                }
+                if (driver != null && driver.validate(ValidationDriver.uriOrFileInputSource(paths[1]))) {
+                    status = "VALID";
+                }
+            } catch (SAXException e) {
+                print(eh, e);
+            } catch (IOException e) {
+                print(eh, e);
+            } catch (Throwable e) {
+                // The command line would have crashed : let the client fall back to it
+                status = "CRASH";
+            }
+            System.out.println(END + " " + status + " " + cache);
+            System.out.flush();
+        }
+    }
+
+    static void print(ErrorHandlerImpl eh, Exception e) {
+        if (eh == null) {
+            eh = new ErrorHandlerImpl(System.out);
+        }
+        eh.printException(e);
+    }
+}
@@ -0,0 +1,891 @@
+import atexit
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from hashlib import md5
+from urllib.parse import urljoin, urlparse
+from urllib.request import url2pathname
+from threading import Timer, Lock, Thread, get_ident
+
+import pkg_resources
+import requests
+from lxml import etree
+
+from HookTest.units import TESTUnit
+from HookTest.cache import DIRECTORY, ResultCache, digest, lock, write
+
+
+JAVA = ["java", "-Duser.country=US", "-Duser.language=en"]
+BATCH_LINE = re.compile(rb"^(.+?):[0-9]+:[0-9]+: (\w+): ")
+
+#: Options of the validation backend in the current process. See :func:`configure`
+SETTINGS = {
+    "daemon": False,
+    "engine": "jing",
+    "cache": None,
+    "schemas": os.path.join(DIRECTORY, "schemas"),
+    "offline": False,
+    "catalogs": [],
+    "slots": None,
+    "jvm": os.path.join(DIRECTORY, "jvm"),
+    "max_errors": 100,
+    "failed": {}
+}
+
+#: Catalog of well-known RNG URLs shipped with HookTest, see :func:`catalog`
+CATALOG = pkg_resources.resource_filename("HookTest", "resources/catalog.json")
+
+#: Version of the cached results, to be changed when the format of dtd_errors changes
+RESULTS_FORMAT = "1"
+
+ENGINES = ["jing", "lxml"]
+
+#: Options tried by :func:`warmup` to shorten the start up of the short-lived Jing processes
+JVM_OPTIONS = ["-XX:TieredStopAtLevel=1", "-XX:+UseSerialGC", "-XX:-UsePerfData"]
+
+#: Memory set aside for each Jing process when the number of slots is derived from the available memory
+JVM_MEMORY = 512 * 1024 * 1024
+
+#: Compiled schema cache use in the current process since the last call to :func:`stats`
+STATS = {
+    "hits": 0,
+    "misses": 0
+}
+
+
+def configure(options):
+    """ Set the validation options of the current process and reset its counters. Used as a pool initializer by \
+    HookTest.test.Test
+
+    :param options: Dictionary of options (daemon : use a persistent JingDaemon instead of one java call per file, \
+    engine : one of ENGINES, cache : directory of the result cache or None, schemas : directory of the downloaded \
+    RNG, offline : never download RNG, catalogs : paths of catalog files extending the bundled one, slots : \
+    multiprocessing semaphore shared by the workers to limit the number of running Jing processes or None, jvm : \
+    directory of the JVM settings saved by :func:`warmup`, max_errors : number of errors after which the validation of \
+    a file is stopped, 0 for no limit, failed : URLs whose download failed during the run, with the reason)
+    :type options: dict
+    """
+    SETTINGS.update(options)
+    stats()
+
+
+def stats():
+    """ Get and reset the compiled schema cache counters of the current process
+
+    Each java call compiles its schema once : a file validated on its own is a miss, and every file of a batch but the
+    first one is a hit. The daemon keeps compiled schemas for the life of the process and reports its own use.
+
+    :returns: Number of hits and misses
+    :rtype: dict
+    """
+    current = dict(STATS)
+    for key in STATS:
+        STATS[key] = 0
+    return current
+
+
+def available_slots():
+    """ Number of Jing processes the available memory of the machine can hold, at JVM_MEMORY each
+
+    :returns: Number of processes or None when the available memory is unknown
+    :rtype: int
+    """
+    available = None
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available = int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    if available is None:
+        try:
+            available = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        except (AttributeError, ValueError, OSError):
+            return None
+    return max(1, available // JVM_MEMORY)
+
+
+@contextmanager
+def slot():
+    """ Wait for one of the slots shared by the workers before running Jing. Without slots, Jing runs right away
+    """
+    if SETTINGS["slots"] is None:
+        yield
+    else:
+        with SETTINGS["slots"]:
+            yield
+
+
+def _java_version():
+    """ Identify the java executable, so that settings saved for another JVM are not used """
+    executable = shutil.which(JAVA[0])
+    if executable is None:
+        return None
+    executable = os.path.realpath(executable)
+    stat = os.stat(executable)
+    return "{0}:{1}:{2}".format(executable, stat.st_mtime_ns, stat.st_size)
+
+
+def _accepted(options):
+    """ Check that the JVM starts with the given options """
+    return subprocess.call(
+        JAVA + options + ["-version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    ) == 0
+
+
+_JVM = {}
+
+
+def jvm_settings():
+    """ Get the JVM settings saved by :func:`warmup` in the jvm directory of the current process
+
+    :returns: Settings or None when they are missing or were made for another java or jing.jar
+    :rtype: dict
+    """
+    directory = SETTINGS["jvm"]
+    if directory not in _JVM:
+        _JVM[directory] = None
+        try:
+            with open(os.path.join(directory, "jvm.json")) as f:
+                settings = json.load(f)
+            archives = [option.split("=", 1)[1] for option in settings["share"] if "SharedArchiveFile" in option]
+            if settings["java"] == _java_version() and settings["jing"] == digest(TESTUnit.JING) and \
+                    all(os.path.isfile(archive) for archive in archives):
+                _JVM[directory] = settings
+        except (OSError, ValueError, KeyError):
+            pass
+    return _JVM[directory]
+
+
+def java(tuned=True):
+    """ Command starting the JVM, with the settings saved by :func:`warmup` when available
+
+    :param tuned: Use the options making short-lived processes start faster. Long-lived ones, such as the daemon \
+    and batches of files, only use the class data sharing archive
+    :type tuned: bool
+    :rtype: list
+    """
+    settings = jvm_settings()
+    if settings is None:
+        return list(JAVA)
+    return JAVA + settings["share"] + (settings["options"] if tuned else [])
+
+
+def warmup(directory=None):
+    """ Build a class data sharing archive of the classes used by Jing and save the JVM options accepted by the \
+    local java. Jing processes started afterwards with the same directory pick them up
+
+    :param directory: Directory of the settings (Default : the jvm directory of the current process)
+    :type directory: str
+    :returns: Saved settings
+    :rtype: dict
+    """
+    directory = directory or SETTINGS["jvm"]
+    os.makedirs(directory, exist_ok=True)
+    options = [option for option in JVM_OPTIONS if _accepted([option])]
+    share = []
+    archive = os.path.join(directory, "jing.jsa")
+    with tempfile.TemporaryDirectory(dir=directory) as build:
+        sample, classes = os.path.join(build, "sample.xml"), os.path.join(build, "classes.lst")
+        with open(sample, "w") as f:
+            f.write('<TEI xmlns="http://www.tei-c.org/ns/1.0"/>')
+        # The classes loaded by a validation are the ones worth sharing
+        subprocess.call(
+            JAVA + ["-XX:DumpLoadedClassList=" + classes, "-jar", TESTUnit.JING, TESTUnit.EPIDOC, sample],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        if os.path.isfile(classes):
+            dumped = subprocess.call(
+                JAVA + [
+                    "-Xshare:dump", "-XX:SharedClassListFile=" + classes,
+                    "-XX:SharedArchiveFile=" + os.path.join(build, "jing.jsa"), "-cp", TESTUnit.JING
+                ],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            if dumped == 0:
+                os.replace(os.path.join(build, "jing.jsa"), archive)
+                if _accepted(["-XX:SharedArchiveFile=" + archive, "-Xshare:on", "-cp", TESTUnit.JING]):
+                    # An archive which cannot be mapped is then ignored without printing anything Jing could report
+                    share = ["-Xlog:disable", "-XX:SharedArchiveFile=" + archive, "-Xshare:auto"]
+
+    settings = {
+        "java": _java_version(),
+        "jing": digest(TESTUnit.JING),
+        "share": share,
+        "options": options
+    }
+    write(os.path.join(directory, "jvm.json"), json.dumps(settings).encode("utf-8"))
+    _JVM.pop(directory, None)
+    return settings
+
+
+#: Elements of RelaxNG pulling in other schema files
+REFERENCES = ["{http://relaxng.org/ns/structure/1.0}include", "{http://relaxng.org/ns/structure/1.0}externalRef"]
+
+_REFERENCES = {}
+
+
+def references(rng_path):
+    """ Local files pulled in by a RelaxNG schema through include and externalRef. They are kept in memory as long \
+    as the schema is not modified
+
+    :param rng_path: Path to the RelaxNG file
+    :returns: Paths of the referenced files. Remote ones are left out
+    :rtype: [str]
+    :raises OSError: When the schema cannot be read
+    """
+    stat = os.stat(rng_path)
+    key = (os.path.abspath(rng_path), stat.st_mtime_ns, stat.st_size)
+    if key not in _REFERENCES:
+        paths = []
+        try:
+            for node in etree.parse(rng_path).iter(*REFERENCES):
+                href = urljoin(node.base or rng_path, node.get("href", ""))
+                parsed = urlparse(href)
+                if parsed.scheme in ("", "file"):
+                    paths.append(url2pathname(parsed.path))
+        except etree.XMLSyntaxError:
+            # Compact syntax or broken schema : the validator reports it
+            pass
+        _REFERENCES[key] = paths
+    return _REFERENCES[key]
+
+
+def schema_digest(rng_path):
+    """ Hash of a RelaxNG schema and of every local file it pulls in, directly or not, so that editing a module of \
+    a modular schema changes it
+
+    :param rng_path: Path to the RelaxNG file
+    :rtype: str
+    :raises OSError: When the schema cannot be read
+    """
+    seen, pending, digests = set(), [rng_path], []
+    while pending:
+        path = pending.pop(0)
+        if os.path.abspath(path) in seen:
+            continue
+        seen.add(os.path.abspath(path))
+        if digests and not os.path.isfile(path):
+            # Missing modules are reported by the validator
+            digests.append(path + "\t")
+            continue
+        digests.append(path + "\t" + digest(path))
+        pending += references(path)
+    if len(digests) == 1:
+        # Schemas without modules keep the hash of their content
+        return digest(rng_path)
+    return md5("\n".join(digests).encode("utf-8")).hexdigest()
+
+
+class Validation(object):
+    """ Raw outcome of a RelaxNG validation of one file
+
+    :param out: Standard output of Jing
+    :type out: bytes
+    :param error: Standard error of Jing
+    :type error: bytes
+    :param timeout: Indicates that the validation was killed for going over the timeout
+    :type timeout: bool
+    :param exception: Exception raised while communicating with Jing
+    :type exception: Exception
+    :param issues: Line, column and message of each error found by an in-process engine, in place of out
+    :type issues: [(int, int, str)]
+    :param truncated: Indicates that the validation was stopped after SETTINGS["max_errors"] errors
+    :type truncated: bool
+    """
+    def __init__(self, out=b"", error=b"", timeout=False, exception=None, issues=None, truncated=False):
+        self.out = out
+        self.error = error
+        self.timeout = timeout
+        self.exception = exception
+        self.issues = issues
+        self.truncated = truncated
+
+
+class Output(object):
+    """ Lines printed by Jing about one file, keeping at most SETTINGS["max_errors"] errors
+
+    :ivar truncated: Indicates that errors were left out
+    """
+    def __init__(self):
+        self.lines = []
+        self.errors = 0
+        self.truncated = False
+
+    def add(self, line):
+        """ Keep a line unless the maximum number of errors is reached
+
+        :param line: Line printed by Jing
+        :type line: bytes
+        :returns: False when the line was left out
+        :rtype: bool
+        """
+        if line.strip():
+            if SETTINGS["max_errors"] and self.errors >= SETTINGS["max_errors"]:
+                self.truncated = True
+                return False
+            self.errors += 1
+        self.lines.append(line)
+        return True
+
+    def value(self):
+        """ Kept lines
+
+        :rtype: bytes
+        """
+        return b"".join(self.lines)
+
+
+def run_jing(rng_path, path, timeout):
+    """ Validate a file with a new ``java -jar jing.jar`` process
+
+    :param rng_path: Path to the RelaxNG file
+    :param path: Path to the XML file to test
+    :param timeout: Time in seconds after which the process is killed
+    :rtype: Validation
+    """
+    output = Output()
+    validation = _run(java() + ["-jar", TESTUnit.JING, rng_path, path], timeout, output.add)
+    validation.out, validation.truncated = output.value(), output.truncated
+    return validation
+
+
+def run_jing_batch(rng_path, paths, timeout):
+    """ Validate several files with a single ``java -jar jing.jar`` process
+
+    Jing prefixes its messages with the absolute path of the file they relate to, which is used to split the output
+    back per file. As Jing stops at the first fatal error, the files following it are left out of the results.
+
+    :param rng_path: Path to the RelaxNG file
+    :param paths: Paths to the XML files to test
+    :param timeout: Time in seconds allowed for each file
+    :returns: Validation of each path that could be checked. Empty if the output of Jing cannot be split
+    :rtype: dict
+    """
+    absolute = OrderedDict((os.path.abspath(path), path) for path in paths)
+    outputs = OrderedDict((path, Output()) for path in absolute)
+    fatal, unattributed = [], []
+
+    def collect(line):
+        if b"_JAVA_OPTIONS" in line or fatal:
+            return True
+        located = BATCH_LINE.match(line)
+        if not located or located.group(1).decode("utf-8") not in outputs:
+            # Not about one of the files : most likely an issue with the schema
+            unattributed.append(line)
+            return False
+        path = located.group(1).decode("utf-8")
+        # Errors over the limit of a file are dropped, the other files still need Jing
+        outputs[path].add(line)
+        if located.group(2) == b"fatal":
+            fatal.append(path)
+        return True
+
+    # A batch runs long enough for the optimizing compiler to pay off
+    batch = _run(
+        java(tuned=False) + ["-jar", TESTUnit.JING, rng_path] + list(absolute), timeout * len(absolute), collect
+    )
+    if batch.timeout or batch.exception is not None or _filter(batch.error) or unattributed:
+        return {}
+
+    checked = list(outputs).index(fatal[0]) + 1 if fatal else len(outputs)
+    return {
+        absolute[path]: Validation(out=output.value(), truncated=output.truncated)
+        for path, output in list(outputs.items())[:checked]
+    }
+
+
+#: Compiled schemas by thread, path and hash of the schema with its modules. lxml keeps the errors of the last
+#: validation on the schema, so that threads of the same process do not share them
+_RELAXNG = {}
+#: The RelaxNG compiler of libxml2 is not thread safe : threads compile one schema at a time
+_COMPILING = Lock()
+
+
+def relaxng(rng_path):
+    """ Get the compiled lxml RelaxNG of a schema, from the cache of the current thread when possible
+
+    :param rng_path: Path to the RelaxNG file
+    :returns: Compiled schema or None if lxml cannot compile it
+    :rtype: etree.RelaxNG
+    """
+    try:
+        key = (get_ident(), rng_path, schema_digest(rng_path))
+    except OSError:
+        return None
+    if key in _RELAXNG:
+        STATS["hits"] += 1
+    else:
+        STATS["misses"] += 1
+        try:
+            with _COMPILING:
+                _RELAXNG[key] = etree.RelaxNG(etree.parse(rng_path))
+        except (etree.RelaxNGParseError, etree.XMLSyntaxError):
+            # Some valid schemas are too much for libxml2
+            _RELAXNG[key] = None
+    return _RELAXNG[key]
+
+
+def run_lxml(rng_path, path, tree=None):
+    """ Validate a file in the current process with lxml
+
+    :param rng_path: Path to the RelaxNG file
+    :param path: Path to the XML file to test
+    :param tree: Already parsed XML file, to avoid reading it again
+    :type tree: etree._ElementTree
+    :returns: Validation or None if lxml cannot compile the schema
+    :rtype: Validation
+    """
+    schema = relaxng(rng_path)
+    if schema is None:
+        return None
+    if tree is None:
+        try:
+            tree = etree.parse(path, TESTUnit.PARSER)
+        except etree.XMLSyntaxError as E:
+            # The log is shared with previous errors of the thread. Like Jing, stop at the first fatal error
+            error = next((error for error in E.error_log if error.filename == path), E.error_log.last_error)
+            return Validation(issues=[(error.line, error.column, "fatal: " + error.message)])
+        except OSError as E:
+            return Validation(exception=E)
+    if schema.validate(tree):
+        return Validation(issues=[])
+    issues = [
+        (error.line, error.column, "{0}: {1}".format(error.level_name.lower(), error.message))
+        for error in schema.error_log
+    ]
+    if SETTINGS["max_errors"] and len(issues) > SETTINGS["max_errors"]:
+        return Validation(issues=issues[:SETTINGS["max_errors"]], truncated=True)
+    return Validation(issues=issues)
+
+
+def _run(command, timeout, collect):
+    """ Run Jing, reading its standard output line by line
+
+    :param command: Command to run
+    :param timeout: Time in seconds after which the process is killed
+    :param collect: Function receiving each line of the standard output. The process is killed when it returns False
+    :rtype: Validation
+    """
+    with slot():
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            shell=False
+        )
+        validation = Validation()
+        errors = []
+        # Read concurrently, so that neither pipe fills up while the other one is read
+        reader = Thread(target=lambda: errors.append(process.stderr.read()))
+        timer = Timer(timeout, process.kill)
+        try:
+            timer.start()
+            reader.start()
+            for line in iter(process.stdout.readline, b""):
+                if collect(line) is False:
+                    process.kill()
+                    break
+            process.stdout.close()
+            reader.join()
+            process.wait()
+        except Exception as E:
+            validation.exception = E
+        finally:
+            validation.timeout = not timer.is_alive()
+            timer.cancel()
+        validation.error = b"".join(errors)
+    return validation
+
+
+def _filter(output):
+    """ Remove the messages about _JAVA_OPTIONS printed by Travis-like environments """
+    return b"".join(line for line in output.splitlines(True) if b"_JAVA_OPTIONS" not in line)
+
+
+class JingDaemon(object):
+    """ Long-lived Jing process validating files sent over its standard input
+
+    The Java side (resources/JingDaemon.java) reads ``<rng path>\\t<file path>\\t<schema hash>`` requests and answers
+    with the output the command line would have given, followed by a line starting with :attr:`END`. The JVM start up
+    and the loading of Jing classes are therefore paid once per process instead of once per file. The schema hash is the
+    one of the schema with its modules (see :func:`schema_digest`) : compiled schemas are kept by path and hash, so that
+    a schema such as tei.rng is compiled once per worker, including remote ones stored locally, and again when one of
+    its modules changes.
+
+    :ivar available: False when the daemon could not be started in this environment
+    """
+    SOURCE = pkg_resources.resource_filename("HookTest", "resources/JingDaemon.java")
+    END = b"\x00HOOKTEST-END"
+    STARTUP = 60
+
+    def __init__(self):
+        self.process = None
+        self.command = None
+        self.pid = os.getpid()
+        self.available = True
+        self.lock = Lock()
+
+    def commands(self):
+        """ Commands able to start the daemon, from the cheapest to the most expensive to set up
+
+        :rtype: iterator(list)
+        """
+        if self.command:
+            yield self.command
+            return
+        # Java 11+ runs the source file directly
+        yield java(tuned=False) + ["-cp", TESTUnit.JING, JingDaemon.SOURCE]
+        # Older JDK need to compile it. Classes are shared by every process using the same source
+        if shutil.which("javac"):
+            classes = os.path.join(tempfile.gettempdir(), "hooktest-jing-" + digest(JingDaemon.SOURCE))
+            if not os.path.isdir(classes):
+                build = tempfile.mkdtemp(prefix="hooktest-jing")
+                compiled = subprocess.call(
+                    ["javac", "-classpath", TESTUnit.JING, "-d", build, JingDaemon.SOURCE],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+                try:
+                    if compiled != 0:
+                        raise OSError("javac failed")
+                    os.rename(build, classes)
+                except OSError:
+                    # Compilation failed or another process was faster
+                    shutil.rmtree(build, ignore_errors=True)
+            yield java(tuned=False) + ["-cp", os.pathsep.join([TESTUnit.JING, classes]), "JingDaemon"]
+
+    def start(self):
+        """ Start the Java process and wait for it to be ready
+
+        :returns: Indicator of success
+        :rtype: bool
+        """
+        for command in self.commands():
+            self.process = subprocess.Popen(
+                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, shell=False
+            )
+            timer = Timer(JingDaemon.STARTUP, self.process.kill)
+            timer.start()
+            ready = self.process.stdout.readline()
+            timer.cancel()
+            if ready.startswith(JingDaemon.END):
+                self.command = command
+                return True
+            self.stop()
+        self.available = False
+        return False
+
+    def stop(self):
+        """ Stop the Java process. It is started again by the next validation """
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+            except (OSError, ValueError):
+                pass
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def validate(self, rng_path, path, timeout):
+        """ Validate a file through the daemon
+
+        :param rng_path: Path to the RelaxNG file
+        :param path: Path to the XML file to test
+        :param timeout: Time in seconds after which the daemon is killed (and restarted for the next file)
+        :returns: Validation or None if the daemon is not usable for this file
+        :rtype: Validation
+
+        .. note:: A slot is held while the daemon starts and validates, not while it waits for the next file
+        """
+        with self.lock, slot():
+            if self.process is None and not self.start():
+                return None
+            process = self.process
+            validation = Validation()
+            timer = Timer(timeout, process.kill)
+            output, status, cache = Output(), None, None
+            try:
+                schema = schema_digest(rng_path)
+            except OSError:
+                # Remote or missing schema, reported by Jing
+                schema = ""
+            try:
+                timer.start()
+                process.stdin.write("{0}\t{1}\t{2}\n".format(rng_path, path, schema).encode("utf-8"))
+                process.stdin.flush()
+                for line in iter(process.stdout.readline, b""):
+                    if line.startswith(JingDaemon.END):
+                        status, cache = (line[len(JingDaemon.END):].split() + [None])[:2]
+                        break
+                    if not output.add(line):
+                        break
+            except Exception as E:
+                validation.exception = E
+            finally:
+                validation.timeout = not timer.is_alive()
+                timer.cancel()
+
+            validation.out, validation.truncated = output.value(), output.truncated
+            if cache == b"HIT":
+                STATS["hits"] += 1
+            elif cache == b"MISS":
+                STATS["misses"] += 1
+            if validation.timeout or validation.truncated:
+                # Stopping the daemon is the only way to interrupt the validation
+                self.stop()
+            elif status is None or status == b"CRASH":
+                # The daemon died or Jing crashed : the command line gives the reference output
+                self.stop()
+                return None
+            return validation
+
+
+#: Daemons started by the current process, one per thread validating at the same time
+_DAEMONS = []
+
+
+def daemon():
+    """ Get an idle JingDaemon of the current process, so that worker threads do not wait for each other. A new \
+    daemon is created when every daemon is busy
+
+    :rtype: JingDaemon
+    """
+    # A forked worker must not share the pipes of its parent daemons
+    if _DAEMONS and _DAEMONS[0].pid != os.getpid():
+        del _DAEMONS[:]
+    for current in _DAEMONS:
+        if not current.lock.locked():
+            return current
+    current = JingDaemon()
+    _DAEMONS.append(current)
+    return current
+
+
+@atexit.register
+def _stop_daemon():
+    for current in _DAEMONS:
+        if current.pid == os.getpid():
+            current.stop()
+
+
+#: Results of :func:`prevalidate` with the thread which called it. They are used by the threads of :func:`submit` too
+_PREVALIDATED = {}
+
+
+def prevalidate(schemas, timeout):
+    """ Validate a chunk of files with one Jing call per schema. The results are then used by :func:`validate`
+
+    :param schemas: Paths to the XML files to test for each path of RelaxNG file
+    :type schemas: dict
+    :param timeout: Time in seconds allowed for each file
+    """
+    # Only the results of previous chunks of the same worker are dropped
+    for key, (thread, _) in list(_PREVALIDATED.items()):
+        if thread == get_ident():
+            _PREVALIDATED.pop(key, None)
+    for rng_path, paths in schemas.items():
+        paths = [path for path in paths if cached(rng_path, path) is None]
+        if len(paths) < 2:
+            continue
+        validations = run_jing_batch(rng_path, paths, timeout)
+        for path, validation in validations.items():
+            _PREVALIDATED[(rng_path, path)] = (get_ident(), validation)
+        if validations:
+            STATS["misses"] += 1
+            STATS["hits"] += len(validations) - 1
+
+
+def validate(rng_path, path, timeout, tree=None):
+    """ Validate a file against a RelaxNG schema with the backend configured for this process
+
+    :param rng_path: Path to the RelaxNG file
+    :param path: Path to the XML file to test
+    :param timeout: Time in seconds allowed for the validation of this file. Not enforced on the lxml engine
+    :param tree: Already parsed XML file, used by the lxml engine
+    :type tree: etree._ElementTree
+    :rtype: Validation
+    """
+    thread, validation = _PREVALIDATED.pop((rng_path, path), (None, None))
+    if validation is not None:
+        return validation
+    if SETTINGS["engine"] == "lxml":
+        validation = run_lxml(rng_path, path, tree)
+        if validation is not None:
+            return validation
+    if SETTINGS["daemon"]:
+        current = daemon()
+        validation = current.validate(rng_path, path, timeout) if current.available else None
+        if validation is not None:
+            return validation
+    STATS["misses"] += 1
+    return run_jing(rng_path, path, timeout)
+
+
+class Pending(object):
+    """ Validation of a file running in a background thread, see :func:`submit`
+
+    :param rng_path: Path to the RelaxNG file
+    :param path: Path to the XML file to test
+    :param timeout: Time in seconds allowed for the validation of this file
+    """
+    def __init__(self, rng_path, path, timeout):
+        self.validation = None
+        self.thread = Thread(target=self.run, args=(rng_path, path, timeout))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self, rng_path, path, timeout):
+        try:
+            self.validation = validate(rng_path, path, timeout)
+        except Exception as E:
+            self.validation = Validation(exception=E)
+
+    def result(self):
+        """ Wait for the validation to be done
+
+        :rtype: Validation
+        """
+        self.thread.join()
+        return self.validation
+
+
+def submit(rng_path, path, timeout):
+    """ Start the validation of a file in a background thread. Jing works in its own process, so the thread only \
+    waits for it and the caller can run its own checks in the meantime
+
+    :param rng_path: Path to the RelaxNG file
+    :param path: Path to the XML file to test
+    :param timeout: Time in seconds allowed for the validation of this file
+    :rtype: Pending
+    """
+    return Pending(rng_path, path, timeout)
+
+
+def validator():
+    """ Identifier of the validator configured for the current process, used to invalidate cached results
+
+    :rtype: str
+    """
+    identifier = "jing-" + digest(TESTUnit.JING)
+    if SETTINGS["engine"] == "lxml":
+        # Jing is used for the schemas lxml cannot compile
+        identifier += "/lxml-{0}-{1}".format(
+            ".".join(map(str, etree.LXML_VERSION)), ".".join(map(str, etree.LIBXML_VERSION))
+        )
+    return identifier
+
+
+def _result_key(rng_path, path):
+    if not SETTINGS["cache"]:
+        return None
+    try:
+        return ResultCache.key(
+            RESULTS_FORMAT, validator(), str(SETTINGS["max_errors"]), schema_digest(rng_path), digest(path)
+        )
+    except OSError:
+        return None
+
+
+def cached(rng_path, path):
+    """ Get the result of a previous validation of the same file content against the same schema content
+
+    :param rng_path: Path to the RelaxNG file
+    :param path: Path to the XML file to test
+    :returns: Dictionary with the status and the dtd_errors of the validation, None if unknown or cache is disabled
+    :rtype: dict
+    """
+    key = _result_key(rng_path, path)
+    if key is None:
+        return None
+    return ResultCache(SETTINGS["cache"]).get(key)
+
+
+def store(rng_path, path, status, dtd_errors):
+    """ Keep the result of a validation for the following runs
+
+    :param rng_path: Path to the RelaxNG file
+    :param path: Path to the XML file tested
+    :param status: Status of the validation
+    :type status: bool
+    :param dtd_errors: Issues found
+    :type dtd_errors: [str]
+    """
+    key = _result_key(rng_path, path)
+    if key is not None:
+        ResultCache(SETTINGS["cache"]).set(key, {"status": status, "dtd_errors": dtd_errors})
+
+
+def fetch(url, timeout):
+    """ Get a local copy of a remote RNG : the file of the catalog or a download, unless it is already in the schema \
+    directory
+
+    Concurrent processes wait for the one downloading the same RNG through a file lock, and the RNG is only written \
+    under its final name once it is complete. A failed download is recorded in SETTINGS["failed"] and the URL is not \
+    requested again during the run.
+
+    :param url: URL of the RNG
+    :param timeout: Time in seconds allowed for the download
+    :returns: Path of the local copy
+    :rtype: str
+    :raises EnvironmentError: If the RNG is not in the schema directory and HookTest is offline or its download failed
+    """
+    local = catalog().get(url)
+    if local:
+        return local
+
+    directory = SETTINGS["schemas"]
+    path = os.path.join(directory, md5(url.encode()).hexdigest() + ".rng")
+    if os.path.exists(path):
+        return path
+    if SETTINGS["offline"]:
+        raise EnvironmentError("{0} was never downloaded and HookTest is offline".format(url))
+    failed = SETTINGS["failed"]
+    if url in failed:
+        raise EnvironmentError(failed[url])
+
+    os.makedirs(directory, exist_ok=True)
+    with lock(path + ".lock"):
+        # Another thread might have failed to download it while we were waiting for the lock
+        if url in failed:
+            raise EnvironmentError(failed[url])
+        # Another process might have downloaded it while we were waiting for the lock
+        if not os.path.exists(path):
+            try:
+                data = requests.get(url, timeout=timeout)
+                data.raise_for_status()
+            except requests.RequestException as E:
+                failed[url] = str(E)
+                raise
+            write(path, data.content)
+    return path
+
+
+_CATALOGS = {}
+
+
+def catalog():
+    """ Map of remote RNG URLs to local files, made of the bundled catalog updated with the catalogs set in SETTINGS
+
+    Catalogs are JSON objects whose keys are URLs and values are paths, relative to the catalog file. The bundled \
+    catalog only holds URLs pinned to the version of the bundled RNG : moving ones such as "latest" or "release" \
+    would silently be validated against an old schema.
+
+    :rtype: dict
+    """
+    paths = tuple([CATALOG] + list(SETTINGS["catalogs"]))
+    if paths not in _CATALOGS:
+        urls = {}
+        for path in paths:
+            with open(path) as f:
+                urls.update({
+                    url: os.path.abspath(os.path.join(os.path.dirname(path), local))
+                    for url, local in json.load(f).items()
+                })
+        _CATALOGS[paths] = urls
+    return _CATALOGS[paths]
@@ -1,17 +1,22 @@
 # -*- coding: utf-8 -*-
 
 import os
+import copy
 import glob
 import statistics
 import sys
 import traceback
 import re
 
-from collections import defaultdict, OrderedDict
-from multiprocessing.pool import Pool
+from collections import defaultdict, deque, OrderedDict
+from functools import partial
+from multiprocessing import BoundedSemaphore
+from multiprocessing.pool import ThreadPool
+from threading import Event, Semaphore
 import json
 import shutil
 import requests
+import validators
 import hashlib
 import hmac
 import time
@@ -20,6 +25,11 @@ from prettytable import ALL as pt_all
 
 import HookTest.capitains_units.cts
 import HookTest.units
+import HookTest.rng
+import HookTest.cache
+import HookTest.executors
+from HookTest.capitains_units.urns import UrnIndex
+from HookTest.document import LARGE_FILE
 from colors import white, magenta
 from operator import attrgetter
 
@@ -27,6 +37,68 @@ from operator import attrgetter
 pr_finder = re.compile("pull/([0-9]+)/head")
 
 
+def resident_memory():
+    """ Resident memory of the current process
+
+    :returns: Size in bytes or None when it is unknown
+    :rtype: int
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+#: Test whose files are checked by the workers of the current process, set by :func:`initialize`
+WORKER = None
+
+
+def initialize(test, options):
+    """ Set up a worker process : configure the RelaxNG validation and keep the settings of the test, so that tasks \
+    only carry the paths of the files
+
+    :param test: Test without its results, see Test.settings
+    :type test: Test
+    :param options: RelaxNG settings, see HookTest.rng.configure
+    :type options: dict
+    """
+    global WORKER
+    HookTest.rng.configure(options)
+    WORKER = test
+
+
+def unit(filepath):
+    """ Test a file in a worker process, see Test.unit
+
+    :param filepath: Path of the file to be tested
+    :type filepath: str
+    :rtype: (UnitLog, str, [str] or str)
+    """
+    return WORKER.unit(filepath)
+
+
+def units(filepaths):
+    """ Test a chunk of text files in a worker process, see Test.units
+
+    :param filepaths: Path of the files to be tested
+    :type filepaths: [str]
+    :rtype: ([(UnitLog, str, [str] or str)], dict)
+    """
+    return WORKER.units(filepaths)
+
+
+def measured(function, task):
+    """ Run a task in a worker and measure the resident memory of the worker once it is done
+
+    :param function: Function running the task
+    :param task: Argument of the function
+    :returns: Result of the function and resident memory of the worker in bytes
+    :rtype: (object, int)
+    """
+    return function(task), resident_memory()
+
+
 class DefaultFinder(object):
     """ Finder are object used in Test to retrieve the target files of the tests
 
@@ -50,6 +122,15 @@ class DefaultFinder(object):
         files.sort()
         return files, cts
 
+    def includes(self, urn):
+        """ Check that a text would be found, given its URN
+
+        :param urn: URN of the text
+        :type urn: str
+        :rtype: bool
+        """
+        return True
+
 
 class FilterFinder(DefaultFinder):
     """ FilterFinder provide a filtering capacity to DefaultFinder.
@@ -93,6 +174,15 @@ class FilterFinder(DefaultFinder):
         files.sort()
         return files, cts
 
+    def includes(self, urn):
+        """ Check that a text would be found, given its URN
+
+        :param urn: URN of the text
+        :type urn: str
+        :rtype: bool
+        """
+        return urn.split(":")[-1].split(".")[:len(self.include)] == self.include
+
 
 class Test(object):
     """ Create a Test object
@@ -115,8 +205,41 @@ class Test(object):
     :type finderoptions: dict
     :param countwords: Enable counting words for text tests (False by default)
     :type countwords: bool
+    :param rng_daemon: Validate RelaxNG through one persistent Jing process per worker
+    :type rng_daemon: bool
+    :param rng_batch: Number of texts validated by a single Jing call when the scheme is a single RNG file
+    :type rng_batch: int
+    :param rng_engine: RelaxNG validator, one of HookTest.rng.ENGINES
+    :type rng_engine: str
+    :param rng_cache: Reuse the RelaxNG results of files which did not change since a previous run
+    :type rng_cache: bool
+    :param cache_dir: Directory of the cache (Default : HookTest.cache.DIRECTORY)
+    :type cache_dir: str
+    :param offline: Never download remote RNG, failing the texts whose RNG was not downloaded by a previous run
+    :type offline: bool
+    :param catalogs: JSON files mapping remote RNG URLs to local RNG, on top of the catalog shipped with HookTest
+    :type catalogs: [str]
+    :param rng_last: Validate against RelaxNG only the texts which pass every other test
+    :type rng_last: bool
+    :param rng_slots: Maximum number of Jing processes running at the same time across workers (Default : as many \
+    as the available memory holds, see HookTest.rng.available_slots)
+    :type rng_slots: int
+    :param rng_max_errors: Number of RelaxNG errors after which the validation of a text is stopped, 0 for no limit
+    :type rng_max_errors: int
+    :param recycle: Number of tasks, chunks of up to Test.CHUNK_FILES files, after which a worker is replaced by a new \
+    process (Default : never)
+    :type recycle: int
+    :param max_memory: Resident memory in bytes above which the workers are replaced once their running tasks are \
+    done (Default : no limit)
+    :type max_memory: int
+    :param executor: Workers running the tests, one of HookTest.executors.EXECUTORS. Recycling only applies to \
+    processes
+    :type executor: str
     """
     STACK_TRIGGER_SIZE = 10
+    DOWNLOADS = 8
+    CHUNK_SIZE = 256 * 1024
+    CHUNK_FILES = 16
     FAILURE = "failed"
     ERROR = "error"
     SUCCESS = "success"
@@ -133,8 +256,11 @@ class Test(object):
             workers=1, scheme="auto",
             verbose=0, ping=None, secret="", triggering_size=None, console=False, build_manifest=False,
             finder=DefaultFinder, finderoptions=None, countwords=False, allowfailure=False,
-            from_travis_to_hook=False, timeout=30, guidelines=None,
-            **kwargs
+            from_travis_to_hook=False, timeout=30, guidelines=None, rng_daemon=False,
+            rng_batch=1, rng_engine="jing", rng_cache=True, cache_dir=None,
+            offline=False, catalogs=None, rng_last=False, rng_slots=None,
+            rng_max_errors=100, large_file=LARGE_FILE, recycle=None, max_memory=None,
+            executor="process", **kwargs
     ):
         """ Create a Test object
 
@@ -160,6 +286,39 @@ class Test(object):
         :type countwords: bool
         :param build_manifest: Build a manifest at the end of the test
         :type build_manifest: bool
+        :param rng_daemon: Validate RelaxNG through one persistent Jing process per worker
+        :type rng_daemon: bool
+        :param rng_batch: Number of texts validated by a single Jing call when the scheme is a single RNG file
+        :type rng_batch: int
+        :param rng_engine: RelaxNG validator, one of HookTest.rng.ENGINES
+        :type rng_engine: str
+        :param rng_cache: Reuse the RelaxNG results of files which did not change since a previous run
+        :type rng_cache: bool
+        :param cache_dir: Directory of the cache (Default : HookTest.cache.DIRECTORY)
+        :type cache_dir: str
+        :param offline: Never download remote RNG, failing the texts whose RNG was not downloaded by a previous run
+        :type offline: bool
+        :param catalogs: JSON files mapping remote RNG URLs to local RNG, on top of the catalog shipped with HookTest
+        :type catalogs: [str]
+        :param rng_last: Validate against RelaxNG only the texts which pass every other test
+        :type rng_last: bool
+        :param rng_slots: Maximum number of Jing processes running at the same time across workers (Default : as \
+        many as the available memory holds, see HookTest.rng.available_slots)
+        :type rng_slots: int
+        :param rng_max_errors: Number of RelaxNG errors after which the validation of a text is stopped, 0 for no limit
+        :type rng_max_errors: int
+        :param large_file: Size in bytes above which texts are parsed with a huge tree parser, without keeping their \
+        content next to the tree
+        :type large_file: int
+        :param recycle: Number of tasks, chunks of up to Test.CHUNK_FILES files, after which a worker is replaced \
+        by a new process (Default : never)
+        :type recycle: int
+        :param max_memory: Resident memory in bytes above which the workers are replaced once their running tasks \
+        are done (Default : no limit)
+        :type max_memory: int
+        :param executor: Workers running the tests, one of HookTest.executors.EXECUTORS. Recycling only applies to \
+        processes
+        :type executor: str
         """
         self.depth = 10
         self.console = console
@@ -182,6 +341,26 @@ class Test(object):
         self.__triggering_size = None
         self.timeout = timeout
         self.guidelines = guidelines
+        self.cache_dir = cache_dir or HookTest.cache.DIRECTORY
+        self.rng_options = {
+            "daemon": rng_daemon,
+            "engine": rng_engine,
+            "cache": os.path.join(self.cache_dir, "rng") if rng_cache else None,
+            "schemas": os.path.join(self.cache_dir, "schemas"),
+            "offline": offline,
+            "catalogs": catalogs or [],
+            "jvm": os.path.join(self.cache_dir, "jvm"),
+            "max_errors": rng_max_errors
+        }
+        self.rng_batch = rng_batch
+        self.rng_last = rng_last
+        self.rng_slots = rng_slots
+        self.rng_cache = {"hits": 0, "misses": 0}
+        self.large_file = large_file
+        self.recycle = recycle or None
+        self.max_memory = max_memory or None
+        self.recycled = 0
+        self.executor = executor
         if self.guidelines is None:
             if self.scheme == "epidoc":
                 self.guidelines = "2.epidoc"
@@ -199,7 +378,7 @@ class Test(object):
             )
         self.results = OrderedDict()
         self.passing = defaultdict(bool)
-        self.inventory = []
+        self.inventory = UrnIndex()
         self.text_files = []
         self.cts_files = []
         self.progress = None
@@ -241,11 +420,31 @@ class Test(object):
         coverage = 0
         if len(self.results) > 0:
             coverage = statistics.mean([test.coverage for test in self.results.values()])
-        return {
+        report = {
             "status": self.status,
             "units": [unitlog.dict for unitlog in self.results.values()],
             "coverage": coverage
         }
+        orphans, missing = self.orphans()
+        if orphans or missing:
+            report["inventory"] = {
+                "orphans": [{"name": name, "urn": urn} for name, urn in orphans],
+                "missing": [{"urn": urn, "metadata": name} for urn, name in missing]
+            }
+        return report
+
+    def orphans(self):
+        """ Texts without metadata and metadata entries without text, once the texts are resolved against the \
+        inventory
+
+        :returns: Name and URN of the texts, URN and metadata file of the entries
+        :rtype: ([(str, str)], [(str, str)])
+        """
+        if not self.text_files:
+            # Entries are not missing when no text was tested
+            return [], []
+        missing = [(urn, name) for urn, name in self.inventory.missing() if self.finder.includes(urn)]
+        return sorted(self.inventory.orphans), missing
 
     @property
     def directory(self):
@@ -304,6 +503,190 @@ class Test(object):
     def count_files(self):
         return len(self.text_files) + len(self.cts_files)
 
+    @property
+    def schema(self):
+        """ RelaxNG file shared by all texts, if the scheme uses one
+
+        :rtype: str
+        """
+        return {
+            "tei": HookTest.units.TESTUnit.TEI_ALL,
+            "epidoc": HookTest.units.TESTUnit.EPIDOC,
+            "local_file": self.rng
+        }.get(self.scheme)
+
+    def schemas(self, filepath):
+        """ RelaxNG files a text is validated against, when they can be known before its tests
+
+        :param filepath: Path of the text
+        :type filepath: str
+        :rtype: [str]
+        """
+        if self.schema:
+            return [self.schema]
+        elif self.scheme == "auto_rng":
+            try:
+                unit = HookTest.capitains_units.cts.CTSText_TestUnit(filepath, timeout=self.timeout)
+                return [path for path in unit.xml_models() if os.path.isfile(path)]
+            except Exception:
+                # The unit test will report it
+                return []
+        return []
+
+    def prefetch(self):
+        """ Download in parallel the remote RNG declared by the texts, so that workers find them in the cache
+
+        .. note:: Failures are ignored : they are reported by the tests of the texts needing the RNG, which do not \
+        request the failed URLs again, see HookTest.rng.fetch
+        """
+        urls = set()
+        for filepath in self.text_files:
+            try:
+                unit = HookTest.capitains_units.cts.CTSText_TestUnit(filepath, timeout=self.timeout)
+                urls.update(uri for uri in unit.xml_model_uris() if validators.url(uri))
+            except Exception:
+                continue
+
+        def fetch(url):
+            try:
+                HookTest.rng.fetch(url, self.timeout)
+            except Exception:
+                pass
+
+        if urls:
+            with ThreadPool(processes=min(len(urls), Test.DOWNLOADS)) as pool:
+                pool.map(fetch, sorted(urls))
+
+    def chunks(self, files):
+        """ Split files in chunks sent to the workers as single tasks, largest first
+
+        Files are sorted by size, so that the largest texts do not start last and decide of the duration of the run. \
+        Small files are grouped until a chunk reaches Test.CHUNK_SIZE bytes or Test.CHUNK_FILES files. Chunks get \
+        smaller as the files left to chunk get fewer, down to single files, so that the workers finish together. A \
+        chunk holds at least rng_batch files when Jing validates them in batches (keeping at least one chunk per \
+        worker) : with the auto scheme, texts are then grouped by their RelaxNG files first, so that each batch can be \
+        validated with a single Jing call per schema.
+
+        :param files: Path of the files to split
+        :type files: [str]
+        :rtype: [[str]]
+        """
+        batch = max(1, min(self.rng_batch, -(-len(files) // self.workers)))
+        groups = OrderedDict()
+        for filepath in files:
+            if self.scheme == "auto_rng" and batch > 1 and self.rng_options["engine"] == "jing" and \
+                    not filepath.endswith("__cts__.xml"):
+                groups.setdefault(tuple(self.schemas(filepath)), []).append(filepath)
+            else:
+                groups.setdefault(None, []).append(filepath)
+
+        chunks = []
+        for group in groups.values():
+            group = sorted(zip(group, map(Test.size, group)), key=lambda item: -item[1])
+            while group:
+                # A quarter of the share of each worker in the files left
+                limit = max(batch, min(Test.CHUNK_FILES, len(group) // (self.workers * 4)))
+                chunk, size = group[:1], group[0][1]
+                for filepath, filesize in group[1:limit]:
+                    if len(chunk) >= batch and size + filesize > Test.CHUNK_SIZE:
+                        break
+                    chunk.append((filepath, filesize))
+                    size += filesize
+                group = group[len(chunk):]
+                chunks.append(chunk)
+        # Chunks of different schemas are sent by decreasing size of their largest file
+        return [[filepath for filepath, _ in chunk] for chunk in sorted(chunks, key=lambda chunk: -chunk[0][1])]
+
+    @staticmethod
+    def size(filepath):
+        """ Size of a file, 0 when it cannot be read
+
+        :param filepath: Path of the file
+        :type filepath: str
+        :rtype: int
+        """
+        try:
+            return os.path.getsize(filepath)
+        except OSError:
+            return 0
+
+    def slots(self):
+        """ Semaphore shared by the workers to limit the number of Jing processes running at the same time
+
+        :returns: Semaphore or None when every worker can run its own Jing process
+        :rtype: multiprocessing.BoundedSemaphore
+        """
+        slots = self.rng_slots or HookTest.rng.available_slots()
+        if slots is None or slots >= self.workers:
+            return None
+        return BoundedSemaphore(slots)
+
+    def settings(self):
+        """ Copy of the test without the results collected so far, sent once to each worker
+
+        :rtype: Test
+        """
+        settings = copy.copy(self)
+        settings.results = OrderedDict()
+        settings.passing = defaultdict(bool)
+        settings.text_files = []
+        settings.cts_files = []
+        settings.progress = None
+        settings.inventory = UrnIndex()
+        return settings
+
+    def map(self, function, tasks):
+        """ Run tasks in a pool of workers and yield their results as they come
+
+        Worker processes are replaced after self.recycle tasks. When a worker process reaches self.max_memory, no more \
+        tasks are sent to the pool : the running ones are finished and the remaining tasks go to a new pool. Tasks are \
+        sent to the pool at most two per worker ahead, so that they can be held back. Threads and the serial executor \
+        share the memory of the main process and are never recycled.
+
+        :param function: Module level function running a task in a worker, such as :func:`unit`
+        :param tasks: Arguments of the function
+        :returns: Results of the tasks, in no specific order
+        """
+        # Settings, semaphores and failed downloads are shared through the pool initializer, so that tasks only carry
+        # their arguments
+        options = dict(self.rng_options, slots=self.slots(), failed=HookTest.rng.SETTINGS["failed"])
+        settings = self.settings()
+        processes = self.executor == "process"
+        max_memory = self.max_memory if processes else None
+        tasks = deque(tasks)
+        ahead = self.workers * 2
+        while True:
+            window, recycling = Semaphore(ahead), Event()
+
+            def feed():
+                while True:
+                    window.acquire()
+                    if recycling.is_set() or not tasks:
+                        return
+                    yield tasks.popleft()
+
+            with HookTest.executors.executor(
+                self.executor, self.workers, initializer=initialize, initargs=(settings, options),
+                maxtasksperchild=self.recycle if processes else None
+            ) as executor:
+                try:
+                    for result, memory in executor.imap_unordered(partial(measured, function), feed()):
+                        if max_memory and memory is not None and memory > max_memory:
+                            recycling.set()
+                        window.release()
+                        yield result
+                    # Required for coverage
+                    executor.close()
+                    executor.join()
+                finally:
+                    # Unblocks the feed when the results are not all consumed
+                    recycling.set()
+                    for _ in range(ahead):
+                        window.release()
+            if not tasks:
+                return
+            self.recycled += 1
+
     def flush(self, stack):
         """ Flush the remaining logs to the endpoint
 
@@ -337,8 +720,9 @@ class Test(object):
 
         :param filepath: Path of the file to be tested
         :type filepath: str
-        :returns: A UnitLog
-        :rtype: UnitLog
+        :returns: A UnitLog, the path of the file and the URNs of a metadata file or the URN of a text. The inventory \
+        test of texts is left to Test.resolve
+        :rtype: (UnitLog, str, [str] or str)
         """
         logs = []
         results = {}
@@ -363,16 +747,22 @@ class Test(object):
             additional += unit.urns
 
         else:
-            unit = HookTest.capitains_units.cts.CTSText_TestUnit(filepath, countwords=self.countwords, timeout=self.timeout)
+            unit = HookTest.capitains_units.cts.CTSText_TestUnit(
+                filepath, countwords=self.countwords, timeout=self.timeout, large_file=self.large_file
+            )
             texttype = "CTSText"
             logs.append(">>>> Testing " + filepath.split("data")[-1])
-            for name, status, unitlogs in unit.test(self.scheme, self.guidelines, self.rng, self.inventory):
+            positions = []
+            for name, status, unitlogs in unit.test(
+                    self.scheme, self.guidelines, self.rng, rng_last=self.rng_last
+            ):
 
                 if status:
                     status_str = " passed"
                 else:
                     status_str = " failed"
 
+                positions.append(len(logs))
                 logs.append(">>>>> " + name + status_str)
 
                 if self.verbose > 0 and len(unitlogs) > 0:
@@ -387,10 +777,68 @@ class Test(object):
             additional['language'] = unit.lang
             additional['empties'] = unit.empties
             additional['capitains_errors'] = unit.capitains_errors
+            additional['strategy'] = unit.document.strategy
             if self.countwords:
                 additional["words"] = unit.count
+            return self.cover(
+                filepath, results, testtype=texttype, logs=logs, additional=additional, positions=positions
+            ), filepath, unit.urn
         return self.cover(filepath, results, testtype=texttype, logs=logs, additional=additional), filepath, additional
 
+    def resolve(self, result, urn):
+        """ Complete the result of a text with the inventory test, once every metadata file is tested
+
+        :param result: Result of the other tests of the text
+        :type result: UnitLog
+        :param urn: URN of the text
+        :type urn: str
+        :returns: Result of the text
+        :rtype: UnitLog
+        """
+        tests = HookTest.capitains_units.cts.CTSText_TestUnit.tests
+        readable = HookTest.capitains_units.cts.CTSText_TestUnit.readable
+        name = readable["inventory"]
+        status = bool(urn) and self.inventory.find(urn, result.name)
+        if status:
+            status_str = " passed"
+        else:
+            status_str = " failed"
+
+        # The test is put back where the unit would have run it
+        following = []
+        if "inventory" in tests:
+            following = [readable[test] for test in tests[tests.index("inventory") + 1:]]
+        units, logs = OrderedDict(), list(result.logs)
+        for position, (test, test_status) in enumerate(result.units.items()):
+            if test in following and name not in units and position < len(result.positions):
+                units[name] = status
+                logs.insert(result.positions[position], ">>>>> " + name + status_str)
+            units[test] = test_status
+        if name not in units:
+            units[name] = status
+            logs.append(">>>>> " + name + status_str)
+        return self.cover(result.name, units, testtype=result.testtype, logs=logs, additional=result.additional)
+
+    def units(self, filepaths):
+        """ Do test for a chunk of files. When the RNG files of the texts are known, they are validated by a single \
+        Jing call per RNG file and batch of rng_batch texts before the unit tests
+
+        :param filepaths: Path of the files to be tested
+        :type filepaths: [str]
+        :returns: Result of Test.unit for each file, compiled schema cache use of the chunk
+        :rtype: ([(UnitLog, str, [str] or str)], dict)
+        """
+        texts = [filepath for filepath in filepaths if not filepath.endswith("__cts__.xml")]
+        if self.rng_batch > 1 and self.rng_options["engine"] == "jing":
+            for i in range(0, len(texts), self.rng_batch):
+                batch = texts[i:i + self.rng_batch]
+                if len(batch) > 1:
+                    HookTest.rng.prevalidate(
+                        OrderedDict((schema, batch) for schema in self.schemas(batch[0])),
+                        self.timeout
+                    )
+        return [self.unit(filepath) for filepath in filepaths], HookTest.rng.stats()
+
     def run(self):
         """ Run the tests
 
@@ -401,35 +849,62 @@ class Test(object):
         self.text_files, self.cts_files = self.find()
         self.start()
 
-        # We deal with Inventory files first to get a list of urns
-        with Pool(processes=self.workers) as executor:
-            # We iterate over the list of files, checking them in parallel.
-            for future in executor.imap_unordered(self.unit, self.cts_files):
-                result, filepath, additional = future
-                self.results[filepath] = result
-                self.passing[filepath] = result.status
-                self.inventory += additional
-                self.log(self.results[filepath])
-
-            # Required for coverage
-            executor.close()
-            executor.join()
-            self.middle()  # To print the results from the metadata file tests
-
-        # Now deal with the text files.
-        with Pool(processes=self.workers) as executor:
-            for future in executor.imap_unordered(self.unit, self.text_files):
-                result, filepath, additional = future
-                self.results[filepath] = result
-                self.passing[filepath] = result.status
-                self.log(self.results[filepath])
-
-            # Required for coverage
-            executor.close()
-            executor.join()
+        # Downloads failed in a previous run are tried again
+        HookTest.rng.configure(dict(self.rng_options, failed={}))
+        if self.rng_options["cache"]:
+            HookTest.cache.ResultCache(self.rng_options["cache"]).evict()
+
+        if self.scheme == "auto_rng":
+            self.prefetch()
+
+        # Metadata files and texts share the pool. Metadata files are sent first, as texts are only resolved against
+        # the inventory once every metadata file is tested
+        tasks = self.chunks(self.cts_files) + self.chunks(self.text_files)
+        metadata = len(self.cts_files)
+        texts = deque()
+        if not metadata:
+            self.middle()
+        for future, rng_cache in self.map(units, tasks):
+            for result, filepath, additional in future:
+                if result.testtype == "CTSMetadata":
+                    self.results[filepath] = result
+                    self.passing[filepath] = result.status
+                    for urn in additional:
+                        self.inventory.add(urn, result.name)
+                    self.log(self.results[filepath])
+                    metadata -= 1
+                    if not metadata:
+                        self.middle()  # To print the results from the metadata file tests
+                elif metadata:
+                    texts.append((result, filepath, additional))
+                else:
+                    self.text(result, filepath, additional)
+                while texts and not metadata:
+                    self.text(*texts.popleft())
+            for key, value in rng_cache.items():
+                self.rng_cache[key] += value
+        # Metadata files without a result would otherwise hold back the texts
+        if metadata:
+            self.middle()
+        while texts:
+            self.text(*texts.popleft())
         self.end()
         return self.status
 
+    def text(self, result, filepath, urn):
+        """ Record the result of a text, once resolved against the inventory
+
+        :param result: Result of the other tests of the text
+        :type result: UnitLog
+        :param filepath: Path of the text
+        :type filepath: str
+        :param urn: URN of the text
+        :type urn: str
+        """
+        self.results[filepath] = self.resolve(result, urn)
+        self.passing[filepath] = self.results[filepath].status
+        self.log(self.results[filepath])
+
     def log(self, log):
         """ Deal with middle process situation
 
@@ -490,10 +965,11 @@ class Test(object):
                 display_table = PT(["Filename", "Failed Tests"])
                 display_table.align["Filename", "Failed Tests"] = 'c'
                 display_table.hrules = pt_all
-                for unit in sorted(self.report['units'], key=lambda x: x['name']):
-                    if unit['status'] is not True:
+                # Only the metadata files are tested yet : the inventory part of the report is not needed
+                for unit in sorted(self.results.values(), key=lambda x: x.name):
+                    if unit.status is not True:
                         self.m_passing -= 1
-                        display_table.add_row([unit['name'], '\n'.join(['{test} failed'.format(test=x) for x in unit['units'] if unit['units'][x] is False])])
+                        display_table.add_row([unit.name, '\n'.join(['{test} failed'.format(test=x) for x in unit.units if unit.units[x] is False])])
                 print(display_table, flush=True)
 
     def end(self):
@@ -512,6 +988,8 @@ class Test(object):
             dtd_errors = ''
             capitains_errors = ''
             empty_refs = ''
+            huge = ''
+            strategies = defaultdict(int)
             num_texts = 0
             num_failed = 0
             print('', flush=True)
@@ -564,6 +1042,10 @@ class Test(object):
                             name=magenta(os.path.basename(unit.name)),
                             nodes=', '.join(unit.additional["capitains_errors"]))
 
+                    strategies[unit.additional.get("strategy", "tree")] += 1
+                    if unit.additional.get("strategy") == "huge":
+                        huge += '\t{name}\n'.format(name=os.path.basename(unit.name))
+
                     if unit.additional["empties"]:
                         empty_refs += '\t{name}\t{nodes}\n'.format(
                             name=magenta(os.path.basename(unit.name)),
@@ -609,12 +1091,27 @@ class Test(object):
 
             if capitains_errors:
                 capitains_errors = magenta('CapiTainS parsing errors found:\n') + capitains_errors + '\n'
+            if huge and self.verbose >= 5:
+                huge = 'Large texts parsed with a huge tree parser:\n' + huge + '\n'
+            else:
+                huge = ''
 
-            print("{caps}{dupes}{forbs}{dtds}{empts}>>> End of the test !\n".format(caps=capitains_errors,
-                                                                                    dupes=duplicate_nodes,
-                                                                                    forbs=forbidden_chars,
-                                                                                    dtds=dtd_errors,
-                                                                                    empts=empty_refs))
+            orphans, missing = self.orphans()
+            inventory = ''
+            if self.verbose >= 5:
+                if orphans:
+                    inventory += magenta('Texts without metadata:\n') + ''.join([
+                        '\t{name}\t{urn}\n'.format(name=magenta(os.path.basename(name)), urn=urn) for name, urn in orphans
+                    ]) + '\n'
+                if missing:
+                    inventory += magenta('Metadata without text:\n') + ''.join([
+                        '\t{urn}\t{name}\n'.format(urn=magenta(urn), name=name) for urn, name in missing
+                    ]) + '\n'
+
+            print("{caps}{dupes}{forbs}{dtds}{empts}{large}{inv}>>> End of the test !\n".format(
+                caps=capitains_errors, dupes=duplicate_nodes, forbs=forbidden_chars, dtds=dtd_errors, empts=empty_refs,
+                large=huge, inv=inventory
+            ))
             t_pass = num_texts - num_failed
             cov_results = [test.coverage for test in self.results.values()]
             if cov_results:
@@ -630,6 +1127,26 @@ class Test(object):
             results_table.add_row(["Passing Metadata", self.m_passing])
             results_table.add_row(["Coverage", cov])
             results_table.add_row(["Total Citation Units", "{:,}".format(total_units)])
+            if self.rng_cache["hits"] or self.rng_cache["misses"]:
+                results_table.add_row([
+                    "RNG Schema Cache", "{hits:,} hits / {misses:,} misses".format(**self.rng_cache)
+                ])
+            if self.recycled:
+                results_table.add_row([
+                    "Worker Recycling", "{0:,} pools replaced above {1:,.0f}MB".format(
+                        self.recycled, self.max_memory / 1024 / 1024
+                    )
+                ])
+            if orphans or missing:
+                results_table.add_row([
+                    "Inventory", "{0:,} texts without metadata / {1:,} metadata without text".format(
+                        len(orphans), len(missing)
+                    )
+                ])
+            if strategies["huge"]:
+                results_table.add_row([
+                    "Parsing Strategies", "{0:,} tree / {1:,} huge".format(strategies["tree"], strategies["huge"])
+                ])
             if self.countwords is True:
                 results_table.add_row(["Total Words", "{:,}".format(total_words)])
                 for l, words in language_words.items():
@@ -730,7 +1247,7 @@ class Test(object):
 
         return self.finder.find(self.directory)
 
-    def cover(self, name, test, testtype=None, logs=None, additional=None):
+    def cover(self, name, test, testtype=None, logs=None, additional=None, positions=None):
         """ Given a dictionary, compute the coverage of one item
 
         :param name:
@@ -741,6 +1258,8 @@ class Test(object):
         :type logs: list
         :param testtype: the type of file tested (e.g., CTSMetadata or CTSText)
         :type testtype: str
+        :param positions: Index in logs of the log line of each test
+        :type positions: [int]
         :returns: Passing status
         :rtype: dict
         """
@@ -757,7 +1276,8 @@ class Test(object):
                 status=False not in results,
                 logs=logs,
                 additional=additional,
-                testtype=testtype
+                testtype=testtype,
+                positions=positions
             )
         else:
             return UnitLog(
@@ -817,10 +1337,12 @@ class UnitLog(object):
     :param logs: Logs
     :param sent: Status regarding the logging
     :param additional: Additional informations. Can be used for words counting
+    :param positions: Index in logs of the log line of each test. Without them, tests added by Test.resolve are logged \
+    last
     """
 
-    def __init__(self, directory, name, units, coverage, status, testtype=None, logs=None, sent=False, additional=None
-                 ):
+    def __init__(self, directory, name, units, coverage, status, testtype=None, logs=None, sent=False, additional=None,
+                 positions=None):
         """ Initiate the object
 
         :param name: Name of the tested unit
@@ -829,6 +1351,7 @@ class UnitLog(object):
         :param status: Status of the unit
         :param logs: Logs
         :param sent: Status regarding the logging
+        :param positions: Index in logs of the log line of each test
         """
         self.directory = directory
         self.units = units
@@ -842,6 +1365,7 @@ class UnitLog(object):
         self.logs = logs
         self.additional = {}
         self.testtype = testtype
+        self.positions = positions or []
         if isinstance(additional, dict):
             self.additional = additional
 
@@ -4,11 +4,14 @@ from collections import defaultdict
 import pkg_resources
 from lxml import etree
 
+from HookTest.document import Document, LARGE_FILE, PARSER
+
 
 class TESTUnit(object):
     """ TestUnit Metaclass
 
     :param path: path of the current file
+    :param large_file: Size in bytes above which the file is checked as a large file
     """
 
     EPIDOC = pkg_resources.resource_filename("HookTest", "resources/epidoc.rng")
@@ -19,17 +22,29 @@ class TESTUnit(object):
     SPACE_REPLACER = re.compile(r"(\s{2,})")
     FORBIDDEN_CHAR = re.compile(r"[^\w\d]")
     NS = {"tei": "http://www.tei-c.org/ns/1.0", "ti": "http://chs.harvard.edu/xmlns/cts"}
-    PARSER = etree.XMLParser(no_network=True, resolve_entities=False)
+    PARSER = PARSER
 
-    def __init__(self, path):
+    def __init__(self, path, large_file=LARGE_FILE):
         self.path = path
-        self.xml = None
+        self.document = Document(path, large_file=large_file)
         self.testable = True
         self.__logs = []
         self.__archives = []
         self.Text = False
         self.urn = None
 
+    @property
+    def xml(self):
+        """ Parsed file, shared with the document
+
+        :rtype: lxml.etree._ElementTree
+        """
+        return self.document.xml
+
+    @xml.setter
+    def xml(self, value):
+        self.document.xml = value
+
     @property
     def logs(self):
         return self.__logs
@@ -46,6 +61,36 @@ class TESTUnit(object):
         self.__archives = self.__archives + self.__logs
         self.__logs = []
 
+    def parse(self):
+        """ Parse the xml file, unless it was already done
+
+        :returns: Parsed file
+        :rtype: lxml.etree._ElementTree
+        """
+        return self.document.parse()
+
+    def processing_instructions(self, target):
+        """ Get the processing instructions of the document with the given target
+
+        Uses the parsed file when available. Otherwise, only the prolog is parsed : processing instructions after the \
+        root element are then ignored.
+
+        :param target: Target of the processing instructions (eg. xml-model)
+        :type target: str
+        :rtype: [lxml.etree._ProcessingInstruction]
+        """
+        if self.xml is not None:
+            return self.xml.xpath("/processing-instruction('{0}')".format(target))
+        instructions = []
+        with open(self.path, "rb") as f:
+            for event, node in etree.iterparse(f, events=("start", "pi"), no_network=True, resolve_entities=False):
+                if event == "start":
+                    # Root element : the prolog is over
+                    break
+                if node.target == target:
+                    instructions.append(node)
+        return instructions
+
     def parsable(self):
         """ Check and parse the xml file
 
@@ -53,11 +98,9 @@ class TESTUnit(object):
         :rtype: boolean
         """
         try:
-            with open(self.path) as f:
-                xml = etree.parse(f, TESTUnit.PARSER)
-                self.xml = xml
-                self.testable = True
-                self.log("Parsed")
+            self.parse()
+            self.testable = True
+            self.log("Parsed")
         except Exception as e:
             self.testable = False
             self.error(e)
@@ -87,12 +130,39 @@ class TESTUnit(object):
     def rng_logs(logs):
         """ Return a rng free line
 
-        :param logs: Sum of logs
-        :type logs: str or bytes
+        :param logs: Sum of logs or its lines
+        :type logs: bytes or iterator(bytes)
         :return: LineColumn code, Error
         :rtype: (str, str)
         """
-        logs = [TESTUnit.rng(log) for log in logs.decode("utf-8").split("\n") if bool(log.strip())]
+        if isinstance(logs, bytes):
+            logs = logs.splitlines()
+        return TESTUnit.group_rng_logs(
+            TESTUnit.rng(log.decode("utf-8")) for log in logs if bool(log.strip())
+        )
+
+    @staticmethod
+    def relaxng_logs(issues):
+        """ Return the same lines as rng_logs for the issues found by an in-process RelaxNG engine
+
+        :param issues: Line, column and message of each issue
+        :type issues: [(int, int, str)]
+        :return: Messages with the position of each occurrence
+        :rtype: iterator(str)
+        """
+        return TESTUnit.group_rng_logs(
+            (" " + message, "(L{0} C{1})".format(line, column)) for line, column, message in issues
+        )
+
+    @staticmethod
+    def group_rng_logs(logs):
+        """ Group positions by message
+
+        :param logs: Message and position of each issue
+        :type logs: iterator((str, str))
+        :return: Messages with the position of each occurrence
+        :rtype: iterator(str)
+        """
         filtered_logs = defaultdict(list)
 
         for key, value in logs:
@@ -0,0 +1,77 @@
+""" Time Test.run and Build.plain_text with each executor
+
+Usage : python -m benchmarks.executors [--workers N] [--copies N] [--scheme SCHEME] [--engine ENGINE] [--repeat N]
+
+The corpus is made of --copies copies of tests/100PercentRepo. The result cache of the RelaxNG validation is disabled,
+so that every run validates every text. The best of --repeat runs is kept. Threads only beat processes when the workers
+mostly wait for Jing or run lxml code releasing the GIL, and every executor needs as many cores as workers to beat the
+serial one.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+import HookTest.build
+import HookTest.executors
+import HookTest.rng
+import HookTest.test
+
+
+def corpus(directory, copies):
+    source = "tests/100PercentRepo/data"
+    for copy in range(copies):
+        for name in os.listdir(source):
+            shutil.copytree(os.path.join(source, name), os.path.join(directory, "data", "{0}{1}".format(name, copy)))
+
+
+def run(directory, executor, args):
+    test = HookTest.test.Test(
+        directory, workers=args.workers, scheme=args.scheme, rng_engine=args.engine, rng_cache=False,
+        executor=executor
+    )
+    # Like a new hooktest call, schemas compiled by lxml in the main process by a previous run are not kept
+    HookTest.rng._RELAXNG.clear()
+    start = time.perf_counter()
+    test.run()
+    return time.perf_counter() - start
+
+
+def build(directory, executor, args):
+    shutil.rmtree(os.path.join(directory, "text"), ignore_errors=True)
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        HookTest.build.Build(directory, directory, txt=True, workers=args.workers, executor=executor).plain_text()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--copies", type=int, default=4, help="Number of copies of tests/100PercentRepo")
+    parser.add_argument("--scheme", default="epidoc")
+    parser.add_argument("--engine", default="jing", choices=HookTest.rng.ENGINES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        corpus(directory, args.copies)
+        print("{0} copies, {1} workers, {2} cores, scheme {3}, engine {4}".format(
+            args.copies, args.workers, os.cpu_count(), args.scheme, args.engine
+        ))
+        print("{0:<10} {1:>12} {2:>12}".format("Executor", "Test (s)", "Build (s)"))
+        for executor in HookTest.executors.EXECUTORS:
+            test = min(run(directory, executor, args) for _ in range(args.repeat))
+            plain = min(build(directory, executor, args) for _ in range(args.repeat))
+            print("{0:<10} {1:>12.2f} {2:>12.2f}".format(executor, test, plain))
+            sys.stdout.flush()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
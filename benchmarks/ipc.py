@@ -0,0 +1,48 @@
+""" Measure the bytes sent to the workers of Test.run
+
+Usage : python -m benchmarks.ipc [directory]
+
+The files of the directory (tests/100PercentRepo by default) are tested once. The tasks are then pickled as if they
+were sent to the pool while the results come in : bound Test methods carry the Test and every result collected so far,
+the module level worker functions only carry the path of the files. The settings sent once per worker through the pool
+initializer are measured separately.
+"""
+import argparse
+import pickle
+from collections import OrderedDict
+from functools import partial
+
+import HookTest.test
+
+
+def task(function, filepath):
+    # Tasks of imap_unordered are sent as (job, index, function, args, kwargs)
+    return len(pickle.dumps((0, 0, partial(HookTest.test.measured, function), (filepath, ), {})))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default="tests/100PercentRepo")
+    args = parser.parse_args()
+
+    test = HookTest.test.Test(args.directory, scheme="ignore", countwords=True)
+    test.run()
+    results = list(test.results.items())
+
+    test.results = OrderedDict()
+    bound, module = [], []
+    for filepath, result in results:
+        bound.append(task(test.unit, filepath))
+        module.append(task(HookTest.test.unit, filepath))
+        test.results[filepath] = result
+    settings = len(pickle.dumps((test.settings(), dict(test.rng_options, slots=None))))
+
+    print("{0} files".format(len(results)))
+    print("{0:<10} {1:>12} {2:>12} {3:>12}".format("Task", "First (B)", "Last (B)", "Total (kB)"))
+    for name, sizes in (("bound", bound), ("module", module)):
+        print("{0:<10} {1:>12,} {2:>12,} {3:>12,.1f}".format(name, sizes[0], sizes[-1], sum(sizes) / 1024))
+    print("Settings sent once per worker : {0:,} B".format(settings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+""" Compare the time of a Jing call before and after hooktest-warmup
+
+Usage : python -m benchmarks.jvm_startup [--repeat N]
+
+A minimal text is validated against the bundled EpiDoc schema with one java call per validation, first with the plain
+JVM and then with the settings saved by HookTest.rng.warmup in a temporary directory.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import HookTest.rng
+from HookTest.units import TESTUnit
+
+
+def bench(path, repeat, jvm):
+    HookTest.rng.configure({"jvm": jvm, "daemon": False, "engine": "jing", "cache": None})
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        HookTest.rng.run_jing(TESTUnit.EPIDOC, path, 60)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="Number of java calls for each setting")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "text.xml")
+        with open(path, "w") as f:
+            f.write('<TEI xmlns="http://www.tei-c.org/ns/1.0"/>')
+
+        start = time.perf_counter()
+        settings = HookTest.rng.warmup(os.path.join(directory, "jvm"))
+        print("Warmup : {0:.2f}s, archive : {1}, options : {2}".format(
+            time.perf_counter() - start, "yes" if settings["share"] else "no", " ".join(settings["options"]) or "none"
+        ))
+        print("{0:<8} {1:>10} {2:>10} {3:>10}".format("JVM", "Min (ms)", "Mean (ms)", "Total (s)"))
+        for name, jvm in [("before", os.path.join(directory, "none")), ("after", os.path.join(directory, "jvm"))]:
+            timings = bench(path, args.repeat, jvm)
+            print("{0:<8} {1:>10.0f} {2:>10.0f} {3:>10.2f}".format(
+                name, 1000 * min(timings), 1000 * sum(timings) / len(timings), sum(timings)
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+""" Compare the time spent validating texts with each RelaxNG engine
+
+Usage : python -m benchmarks.rng_engines [directory] [--repeat N]
+
+Each engine validates every text of the directory (tests/ by default) against the bundled TEI and EpiDoc schemas.
+The first file includes the compilation of the schema, which is reported separately.
+"""
+import argparse
+import glob
+import os
+import time
+
+import HookTest.rng
+from HookTest.units import TESTUnit
+
+
+def texts(directory):
+    return sorted(
+        path for path in glob.glob(os.path.join(directory, "**", "*.xml"), recursive=True)
+        if not path.endswith("__cts__.xml")
+    )
+
+
+def bench(schema, paths, repeat, options):
+    HookTest.rng.configure(options)
+    timings = []
+    for _ in range(repeat):
+        for path in paths:
+            start = time.perf_counter()
+            HookTest.rng.validate(schema, path, 60)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default="tests")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of times each file is validated")
+    args = parser.parse_args()
+
+    paths = texts(args.directory)
+    engines = [
+        ("jing", {"engine": "jing", "daemon": False}),
+        ("jing daemon", {"engine": "jing", "daemon": True}),
+        ("lxml", {"engine": "lxml", "daemon": False})
+    ]
+    print("{0} files, {1} run(s)".format(len(paths), args.repeat))
+    print("{0:<8} {1:<12} {2:>10} {3:>10} {4:>10}".format("Schema", "Engine", "First (s)", "Next (ms)", "Total (s)"))
+    for name, schema in [("EpiDoc", TESTUnit.EPIDOC), ("TEI", TESTUnit.TEI_ALL)]:
+        for engine, options in engines:
+            timings = bench(schema, paths, args.repeat, options)
+            following = timings[1:] or [0]
+            print("{0:<8} {1:<12} {2:>10.2f} {3:>10.1f} {4:>10.2f}".format(
+                name, engine, timings[0], 1000 * sum(following) / len(following), sum(timings)
+            ))
+
+
+if __name__ == "__main__":
+    main()
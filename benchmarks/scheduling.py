@@ -0,0 +1,109 @@
+""" Compare the files sent to the workers one by one in alphabetical order with the largest first chunks of Test.chunks
+
+Usage : python -m benchmarks.scheduling [--workers N] [--copies N] [--scale N] [--scheme SCHEME] [--real]
+
+The corpus is made of --copies copies of the texts of tests/repoFilters and tests/100PercentRepo, and of a large
+edition at the end of the alphabet : the longest text of tests/100PercentRepo with its body repeated --scale times.
+
+Each file is tested once on its own to time it. The tasks of both schedules are then handed to --workers simulated
+workers, in order, each task going to the first free worker. The tail is the time between the first worker running out
+of tasks and the end of the run. With --real, Test.run is also timed with both schedules, which only makes sense with
+at least as many cores as workers.
+"""
+import argparse
+import heapq
+import os
+import shutil
+import tempfile
+import time
+
+from lxml import etree
+
+import HookTest.rng
+import HookTest.test
+
+
+class Alphabetical(HookTest.test.Test):
+    """ Files sent one by one in the order of the finder """
+    def chunks(self, files):
+        return [[filepath] for filepath in files]
+
+
+def corpus(directory, copies, scale):
+    for copy in range(copies):
+        for source in ("tests/repoFilters/data", "tests/100PercentRepo/data"):
+            for name in os.listdir(source):
+                target = os.path.join(directory, "data", "{0}{1}".format(name, copy))
+                shutil.copytree(os.path.join(source, name), target)
+    edition = "tests/100PercentRepo/data/stoa0040a/stoa002/stoa0040a.stoa002.opp-lat1.xml"
+    target = os.path.join(directory, "data", "zzz0001", "zzz001")
+    os.makedirs(target)
+    tree = etree.parse(edition)
+    body = tree.find(".//{http://www.tei-c.org/ns/1.0}body")
+    children = list(body)
+    for _ in range(scale - 1):
+        for child in children:
+            body.append(etree.fromstring(etree.tostring(child)))
+    tree.write(os.path.join(target, "zzz0001.zzz001.opp-lat1.xml"), encoding="utf-8", xml_declaration=True)
+
+
+def durations(test):
+    """ Time each file tested on its own """
+    test.text_files, test.cts_files = test.find()
+    test.start()
+    HookTest.rng.configure(test.rng_options)
+    timings = {}
+    for filepath in test.cts_files + test.text_files:
+        start = time.perf_counter()
+        test.units([filepath])
+        timings[filepath] = time.perf_counter() - start
+    return timings
+
+
+def simulate(tasks, timings, workers):
+    """ Hand the tasks in order to the first free worker
+
+    :returns: Duration of the run and of its tail
+    """
+    free = [0.0] * workers
+    for task in tasks:
+        start = heapq.heappop(free)
+        heapq.heappush(free, start + sum(timings[filepath] for filepath in task))
+    return max(free), max(free) - min(free)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--copies", type=int, default=4, help="Number of copies of the small texts")
+    parser.add_argument("--scale", type=int, default=6, help="Number of copies of the body of the large edition")
+    parser.add_argument("--scheme", default="ignore")
+    parser.add_argument("--real", action="store_true", default=False, help="Also time Test.run")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        corpus(directory, args.copies, args.scale)
+        options = dict(workers=args.workers, scheme=args.scheme, rng_cache=False)
+        timings = durations(HookTest.test.Test(directory, **options))
+        print("{0} files, {1:.2f}s in total, {2:.2f}s for the longest, {3} workers, scheme {4}".format(
+            len(timings), sum(timings.values()), max(timings.values()), args.workers, args.scheme
+        ))
+        print("{0:<14} {1:>6} {2:>14} {3:>10} {4:>10}".format("Schedule", "Tasks", "Simulated (s)", "Tail (s)", "Real (s)"))
+        for name, cls in (("alphabetical", Alphabetical), ("largest-first", HookTest.test.Test)):
+            test = cls(directory, **options)
+            text_files, cts_files = test.find()
+            tasks = test.chunks(cts_files) + test.chunks(text_files)
+            duration, tail = simulate(tasks, timings, args.workers)
+            real = ""
+            if args.real:
+                start = time.perf_counter()
+                test.run()
+                real = "{0:.2f}".format(time.perf_counter() - start)
+            print("{0:<14} {1:>6} {2:>14.2f} {3:>10.2f} {4:>10}".format(name, len(tasks), duration, tail, real))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
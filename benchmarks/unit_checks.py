@@ -0,0 +1,60 @@
+""" Time the metadata and URN checks of the units
+
+Usage : python -m benchmarks.unit_checks [directory] [--repeat N]
+
+Every file of the directory (tests/ by default) is parsed once, then each check runs --repeat times on the parsed
+file. Metadata files go through capitain, metadata and check_urns, texts through has_urn and language.
+"""
+import argparse
+import glob
+import os
+import time
+
+from HookTest.capitains_units.cts import CTSMetadata_TestUnit, CTSText_TestUnit
+
+
+def units(directory):
+    metadata, texts = [], []
+    for path in sorted(glob.glob(os.path.join(directory, "**", "*.xml"), recursive=True)):
+        if path.endswith("__cts__.xml"):
+            unit = CTSMetadata_TestUnit(path)
+            metadata.append(unit)
+        else:
+            unit = CTSText_TestUnit(path)
+            unit.guidelines = "2.epidoc"
+            texts.append(unit)
+        try:
+            unit.parse()
+        except Exception:
+            continue
+        if isinstance(unit, CTSMetadata_TestUnit):
+            list(unit.capitain())
+    return [unit for unit in metadata if unit.xml is not None], [unit for unit in texts if unit.xml is not None]
+
+
+def bench(units, check, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for unit in units:
+            unit.urns = []
+            list(getattr(unit, check)())
+            unit.flush()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default="tests")
+    parser.add_argument("--repeat", type=int, default=100, help="Number of times each check runs on each file")
+    args = parser.parse_args()
+
+    metadata, texts = units(args.directory)
+    print("{0} metadata files, {1} texts, {2} run(s)".format(len(metadata), len(texts), args.repeat))
+    print("{0:<12} {1:>12} {2:>10}".format("Check", "Per file (us)", "Total (s)"))
+    for files, check in [(metadata, "metadata"), (metadata, "check_urns"), (texts, "has_urn"), (texts, "language")]:
+        total = bench(files, check, args.repeat)
+        print("{0:<12} {1:>12.1f} {2:>10.2f}".format(check, 1e6 * total / max(1, len(files) * args.repeat), total))
+
+
+if __name__ == "__main__":
+    main()
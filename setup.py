@@ -45,13 +45,14 @@ setup(
     install_requires=install_requires,
     tests_require=tests_require,
     package_data={
-        'HookTest': ['resources/*.rng']
+        'HookTest': ['resources/*.rng', 'resources/*.java', 'resources/*.json']
     },
     include_package_data=True,
     entry_points={
         'console_scripts': [
             'hooktest=HookTest.cmd:cmd',
-            'hooktest-build=HookTest.cmd:cmd_build'
+            'hooktest-build=HookTest.cmd:cmd_build',
+            'hooktest-warmup=HookTest.cmd:cmd_warmup'
         ]
     },
     test_suite="tests",
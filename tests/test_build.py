@@ -292,6 +292,38 @@ class TestTravis(unittest.TestCase):
         real = [x.replace(self.TESTDIR + 'build/text/', '') for x in real]
         self.assertCountEqual(real, passing_texts, "The files copied for the build do not match the expected value.")
 
+    def test_plain_text_executors(self):
+        """ Tests that threads and the serial executor extract the same plain text files"""
+        self.createTestDir('tests/100PercentRepo')
+        passing_files = [x.replace(self.TESTDIR, '') for x in self.perfect_repo]
+        passing_texts = [x.split('/')[-1].replace('.xml', '.txt') for x in passing_files if '__cts__' not in x]
+        for executor in ('thread', 'serial'):
+            test_pipe = HookTest.build.Travis(
+                path=self.TESTDIR, dest=self.TESTDIR + executor, txt=True, executor=executor
+            )
+            test_pipe.remove_failing(self.perfect_repo, passing_files)
+            with mock.patch('sys.stdout', new_callable=StringIO):
+                test_pipe.plain_text()
+            real = [x.replace(self.TESTDIR + executor + '/text/', '') for x in glob(self.TESTDIR + executor + '/text/*')]
+            self.assertCountEqual(real, passing_texts, "The files extracted by {} do not match".format(executor))
+
+    def test_plain_text_entities(self):
+        """ Tests that the internal entities of a text are replaced in its plain text file"""
+        self.createTestDir('tests/100PercentRepo')
+        passing_files = [x.replace(self.TESTDIR, '') for x in self.perfect_repo]
+        test_pipe = HookTest.build.Travis(path=self.TESTDIR, dest=self.TESTDIR + 'build', txt=True, cites=False)
+        test_pipe.remove_failing(self.perfect_repo, passing_files)
+        path = self.TESTDIR + 'build/data/stoa0007/stoa002/stoa0007.stoa002.opp-lat1.xml'
+        with open(path) as f:
+            xml = f.read()
+        xml = xml.replace('<TEI ', '<!DOCTYPE TEI [<!ENTITY place "Hierusalem">]><TEI ', 1)
+        with open(path, 'w') as f:
+            f.write(xml.replace('De situ Hierusalem nunc', 'De situ &place; nunc', 1))
+        with mock.patch('sys.stdout', new_callable=StringIO):
+            test_pipe.plain_text()
+        with open('{}/build/text/stoa0007.stoa002.opp-lat1.txt'.format(self.TESTDIR)) as f:
+            self.assertIn('De situ Hierusalem nunc', f.read(), 'Entities should be replaced by their text')
+
     def test_plain_text_contents_with_cite(self):
         """ Tests to be sure that the contents of the plain text file produced is correct with citations"""
         with open('tests/txt_files/with_cite/stoa0007.stoa002.opp-lat1.txt') as f:
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from HookTest.cache import ResultCache, digest
+
+
+class TestResultCache(unittest.TestCase):
+    """ Test the on-disk result cache
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ResultCache(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def age(self, key, seconds):
+        """ Make an entry look older than it is """
+        past = time.time() - seconds
+        os.utime(self.cache.path(key), (past, past))
+
+    def test_get_set(self):
+        """ Test that results are read back """
+        key = ResultCache.key("1", "jing", "abc", "def")
+        self.assertIsNone(self.cache.get(key), "Unknown key should give None")
+        self.cache.set(key, {"status": False, "dtd_errors": ["error [In (L1 C1)]"]})
+        self.assertEqual(
+            self.cache.get(key), {"status": False, "dtd_errors": ["error [In (L1 C1)]"]},
+            "Stored result should be read back"
+        )
+        self.assertNotEqual(key, ResultCache.key("1", "lxml", "abc", "def"), "Each part should change the key")
+
+    def test_evict_age(self):
+        """ Test that entries unused for too long are removed """
+        old, recent = ResultCache.key("old"), ResultCache.key("recent")
+        self.cache.set(old, True)
+        self.cache.set(recent, True)
+        self.age(old, 3600)
+        self.assertEqual(self.cache.evict(max_age=60), 1, "One entry should be removed")
+        self.assertIsNone(self.cache.get(old), "Old entry should be removed")
+        self.assertTrue(self.cache.get(recent), "Recent entry should be kept")
+
+    def test_evict_size(self):
+        """ Test that least recently used entries are removed when the cache is too big """
+        keys = [ResultCache.key(str(i)) for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.set(key, "x" * 100)
+            self.age(key, 100 - i)
+        self.cache.get(keys[0])
+        self.assertEqual(self.cache.evict(max_size=250), 1, "One entry should be removed")
+        self.assertEqual(
+            [self.cache.get(key) is not None for key in keys], [True, False, True],
+            "Least recently used entry should be removed"
+        )
+
+    def test_digest(self):
+        """ Test that the hash follows the content of files """
+        path = os.path.join(self.directory, "file.xml")
+        with open(path, "w") as f:
+            f.write("<a/>")
+        first = digest(path)
+        with open(path, "w") as f:
+            f.write("<b/>")
+        os.utime(path, ns=(0, 0))
+        self.assertNotEqual(first, digest(path), "Changed file should get a new hash")
@@ -0,0 +1,95 @@
+import unittest
+
+import mock
+
+import HookTest.document
+import HookTest.rng
+import HookTest.capitains_units.cts
+from HookTest.units import TESTUnit
+
+
+class TestDocument(unittest.TestCase):
+    """ Test that files are parsed once
+    """
+    TEXT = "tests/100PercentRepo/data/stoa0007/stoa002/stoa0007.stoa002.opp-lat1.xml"
+
+    def setUp(self):
+        self.settings = dict(HookTest.rng.SETTINGS)
+        self.tests = HookTest.capitains_units.cts.CTSText_TestUnit.tests
+        HookTest.capitains_units.cts.CTSText_TestUnit.tests = [
+            "parsable", "has_urn", "language", "naming_convention", "refsDecl", "passages",
+            "unique_passage", "duplicate", "forbidden", "empty"
+        ]
+        HookTest.document.stats()
+
+    def tearDown(self):
+        HookTest.rng.configure(self.settings)
+        HookTest.capitains_units.cts.CTSText_TestUnit.tests = self.tests
+
+    def test_unit_parses_once(self):
+        """ Test that every check of a unit uses the same parsed file """
+        # The text declares the latest EpiDoc, which is not bundled
+        catalog = {"http://www.stoa.org/epidoc/schema/latest/tei-epidoc.rng": TESTUnit.EPIDOC}
+        for engine in HookTest.rng.ENGINES:
+            HookTest.rng.configure({"engine": engine, "cache": None})
+            for scheme in ("epidoc", "auto_rng"):
+                unit = HookTest.capitains_units.cts.CTSText_TestUnit(self.TEXT, countwords=True)
+                with mock.patch("HookTest.rng.catalog", return_value=catalog):
+                    results = list(unit.test(scheme, "2.epidoc"))
+                self.assertTrue(all(status for _, status, _ in results), "Text should pass")
+                self.assertEqual(unit.document.parses, 1, "Text should be parsed once")
+        self.assertEqual(HookTest.document.stats(), {"documents": 4, "parses": 4})
+        self.assertEqual(HookTest.document.stats(), {"documents": 0, "parses": 0}, "Counters should be reset")
+
+    def test_failure_parses_once(self):
+        """ Test that a file which cannot be parsed is not parsed again """
+        document = HookTest.document.Document("tests/repo2/data/tlg2255/perseus001/false.xml")
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                document.parse()
+        self.assertEqual(document.parses, 1, "Failure should be kept")
+
+    def test_text(self):
+        """ Test that the MyCapytain text is built once per tree """
+        document = HookTest.document.Document(self.TEXT)
+        self.assertIs(document.text(), document.text(), "Text should be reused")
+        self.assertIs(document.text().xml, document.xml.getroot(), "Text should use the parsed file")
+        self.assertEqual(document.parses, 1, "Text should be parsed once")
+
+    def test_large_file(self):
+        """ Test that large files give the same results, are parsed once and released once the tree is not needed """
+        document = HookTest.document.Document(self.TEXT, large_file=0)
+        self.assertEqual(document.strategy, "huge")
+        self.assertEqual(HookTest.document.Document(self.TEXT).strategy, "tree")
+        self.assertIs(document.parse(), document.parse(), "Large file should be parsed once")
+        document.release()
+        self.assertIsNone(document.xml, "Tree should be released")
+        document.parse()
+        self.assertEqual(document.parses, 2, "Released file should be parsed again when needed")
+
+        results = {}
+        for large_file in (None, 0):
+            unit = HookTest.capitains_units.cts.CTSText_TestUnit(self.TEXT, countwords=True, large_file=large_file)
+            statuses = [(name, status) for name, status, _ in unit.test("ignore", "2.epidoc")]
+            results[unit.document.strategy] = (statuses, unit.urn, unit.lang, unit.count, unit.citation)
+        self.assertEqual(results["huge"], results["tree"], "Huge tree parser should give the same results")
+        self.assertIsNone(unit.xml, "Tree of a large file should be released after the tests which need it")
+        self.assertEqual(unit.document.parses, 1, "Words should be counted on the tree")
+
+    def test_release(self):
+        """ Test that the tree is released once the last test which needs it is done """
+        for engine, countwords, last in (
+                ("jing", False, "Empty References"),
+                ("jing", True, "Word Counting"),
+                ("lxml", False, "Epidoc DTD validation")
+        ):
+            HookTest.rng.configure({"engine": engine, "cache": None})
+            unit = HookTest.capitains_units.cts.CTSText_TestUnit(self.TEXT, countwords=countwords)
+            kept = [name for name, status, _ in unit.test("epidoc", "2.epidoc") if unit.xml is not None]
+            self.assertEqual(kept[-1], last, "Tree should be kept until the last test which needs it")
+            self.assertIsNone(unit.xml, "Tree should be released after the last test which needs it")
+            self.assertEqual(unit.document.parses, 1, "Text should be parsed once")
+
+        unit = HookTest.capitains_units.cts.CTSText_TestUnit("tests/passages/test_passage_fail_second_level.xml")
+        kept = [name for name, status, _ in unit.test("ignore", "2.epidoc") if unit.xml is not None]
+        self.assertEqual(kept[-1], "Passage level parsing", "Tree should be released when the tests break")
@@ -80,6 +80,15 @@ class TestFilterFinders(TestCase):
             "All metadata should be found for version stoa0255.stoa004.perseus-fre2"
         )
 
+    def test_includes(self):
+        """ Test that the URN of texts are matched against the filter like their paths """
+        urn = "urn:cts:latinLit:stoa0255.stoa004.perseus-lat2"
+        for include, expected in (
+                ("stoa0255", True), ("stoa0255.stoa004", True), ("stoa0255.stoa004.perseus-lat2", True),
+                ("stoa0255.stoa004.perseus-fre2", False), ("stoa0255.stoa006", False), ("stoa0256", False)
+        ):
+            self.assertEqual(FilterFinder(include=include).includes(urn), expected, include)
+
 
 class TestFilterFindersInContext(TestCase):
     def test_textgroup(self):
@@ -0,0 +1,509 @@
+import multiprocessing
+import os
+import threading
+import unittest
+import tempfile
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import mock
+import requests
+
+import HookTest.rng
+import HookTest.test
+import HookTest.capitains_units.cts
+from HookTest.units import TESTUnit
+
+
+class TestJing(unittest.TestCase):
+    """ Test the RelaxNG validation backends
+    """
+    FILES = [
+        "tests/repo1/data/hafez/divan/__cts__.xml",
+        "tests/repo1/data/hafez/divan/hafez.divan.perseus-eng1.xml",
+        "tests/test_repositories/test_wrong_tei/data/hafez/divan/hafez.divan.perseus-ger1.xml",
+        "tests/does/not/exist.xml"
+    ]
+
+    def setUp(self):
+        self.settings = dict(HookTest.rng.SETTINGS)
+        # Tests running a Test before these ones leave its result cache configured
+        HookTest.rng.configure({"cache": None, "daemon": False, "engine": "jing"})
+
+    def tearDown(self):
+        HookTest.rng.configure(self.settings)
+
+    def test_run_jing(self):
+        """ Test the per file java call """
+        validation = HookTest.rng.run_jing(TESTUnit.EPIDOC, self.FILES[0], 30)
+        self.assertIn(b'error: element "ti:work" not allowed here', validation.out)
+        self.assertFalse(validation.timeout, "Validation should not time out")
+        validation = HookTest.rng.run_jing(TESTUnit.EPIDOC, self.FILES[1], 30)
+        self.assertEqual((validation.out, validation.error), (b"", b""), "Valid file should not output anything")
+
+    def test_run_jing_batch(self):
+        """ Test that one call on several files gives the output of one call per file """
+        files = self.FILES[:3] + [
+            "tests/repotei/data/tei/tei/tei.tei.tei.xml",
+            "tests/repotei/data/tei/tei/tei.tei.weirdurn.xml"
+        ]
+        batch = HookTest.rng.run_jing_batch(TESTUnit.TEI_ALL, files, 30)
+        self.assertEqual(sorted(batch), sorted(files), "All files should be validated")
+        for path in files:
+            expected = HookTest.rng.run_jing(TESTUnit.TEI_ALL, path, 30)
+            self.assertEqual(batch[path].out, expected.out, "Batch output should be the same for " + path)
+
+    def test_run_jing_batch_fatal(self):
+        """ Test that files after a fatal error are not considered as validated """
+        with tempfile.NamedTemporaryFile(suffix=".xml") as broken:
+            broken.write(b"<TEI><teiHeader></TEI>")
+            broken.flush()
+            files = [self.FILES[1], broken.name, self.FILES[2]]
+            batch = HookTest.rng.run_jing_batch(TESTUnit.EPIDOC, files, 30)
+            self.assertEqual(list(batch), files[:2], "Nothing after a fatal error can be trusted")
+            self.assertEqual(
+                batch[broken.name].out, HookTest.rng.run_jing(TESTUnit.EPIDOC, broken.name, 30).out,
+                "Fatal error should be attributed to its file"
+            )
+
+    def test_run_jing_batch_fallback(self):
+        """ Test that output which cannot be split is not attributed to files """
+
+        files = [self.FILES[0], self.FILES[3], self.FILES[2]]
+        batch = HookTest.rng.run_jing_batch(TESTUnit.EPIDOC, files, 30)
+        self.assertEqual(batch, {}, "Messages without a path should make the batch fall back to single calls")
+
+        batch = HookTest.rng.run_jing_batch("tests/test_auto_rng/data/hafez/__cts__.xml", files[:1], 30)
+        self.assertEqual(batch, {}, "Errors in the schema should not be attributed to files")
+
+    def test_prevalidate(self):
+        """ Test that prevalidated files are not validated again """
+        HookTest.rng.prevalidate({TESTUnit.EPIDOC: self.FILES[:2]}, 30)
+        unit = HookTest.capitains_units.cts.CTSText_TestUnit(self.FILES[0])
+        with mock.patch("HookTest.rng.run_jing") as run_jing:
+            self.assertEqual(list(unit.epidoc()), [False], "Prevalidated result should be used")
+            run_jing.assert_not_called()
+        self.assertEqual(len(unit.dtd_errors), 1, "Prevalidated errors should be logged")
+
+    def test_prevalidate_threads(self):
+        """ Test that threads do not drop the prevalidated files of each other nor share a busy daemon """
+        with mock.patch.dict(HookTest.rng._PREVALIDATED, clear=True):
+            HookTest.rng.prevalidate({TESTUnit.EPIDOC: self.FILES[:2]}, 30)
+            other = threading.Thread(target=HookTest.rng.prevalidate, args=({TESTUnit.EPIDOC: self.FILES[1:3]}, 30))
+            other.start()
+            other.join()
+            with mock.patch("HookTest.rng.run_jing") as run_jing:
+                HookTest.rng.validate(TESTUnit.EPIDOC, self.FILES[0], 30)
+                run_jing.assert_not_called()
+
+        daemon = HookTest.rng.daemon()
+        self.assertIs(HookTest.rng.daemon(), daemon, "An idle daemon should be reused")
+        with daemon.lock:
+            self.assertIsNot(HookTest.rng.daemon(), daemon, "A busy daemon should not be shared")
+
+    def test_daemon_same_output(self):
+        """ Test that the daemon gives exactly the output of the command line """
+        HookTest.rng.configure({"daemon": True})
+        for path in self.FILES:
+            expected = HookTest.rng.run_jing(TESTUnit.EPIDOC, path, 30)
+            validation = HookTest.rng.validate(TESTUnit.EPIDOC, path, 30)
+            self.assertEqual(validation.out, expected.out, "Daemon output should be the same for " + path)
+            self.assertEqual(validation.error, expected.error, "Daemon output should be the same for " + path)
+
+    def test_daemon_timeout(self):
+        """ Test that a timeout on the daemon fails the file and that the next file gets a new daemon """
+        daemon = HookTest.rng.daemon()
+        if not daemon.start():
+            self.skipTest("No way to run the Jing daemon in this environment")
+        validation = daemon.validate(TESTUnit.TEI_ALL, self.FILES[1], 0.01)
+        self.assertTrue(validation.timeout, "Validation should time out")
+        self.assertIsNone(daemon.process, "Daemon should be stopped after a timeout")
+        validation = daemon.validate(TESTUnit.EPIDOC, self.FILES[1], 30)
+        self.assertEqual((validation.out, validation.timeout), (b"", False), "Daemon should be restarted")
+
+    def test_daemon_schema_cache(self):
+        """ Test that the daemon compiles a schema once, unless its content changes """
+        daemon = HookTest.rng.daemon()
+        if not daemon.start():
+            self.skipTest("No way to run the Jing daemon in this environment")
+        HookTest.rng.stats()
+        with tempfile.NamedTemporaryFile(suffix=".rng") as schema:
+            with open(TESTUnit.EPIDOC, "rb") as source:
+                schema.write(source.read())
+            schema.flush()
+            outputs = [daemon.validate(schema.name, path, 30).out for path in self.FILES]
+            self.assertEqual(HookTest.rng.stats(), {"hits": 3, "misses": 1}, "Schema should be compiled once")
+            self.assertEqual(
+                outputs, [HookTest.rng.run_jing(schema.name, path, 30).out for path in self.FILES],
+                "Cached schema should give the same output"
+            )
+            HookTest.rng.stats()
+
+            schema.write(b"\n")
+            schema.flush()
+            daemon.validate(schema.name, self.FILES[1], 30)
+            self.assertEqual(HookTest.rng.stats(), {"hits": 0, "misses": 1}, "Changed schema should be recompiled")
+
+    def test_daemon_schema_modules(self):
+        """ Test that the daemon compiles a schema again when one of its modules changes """
+        daemon = HookTest.rng.daemon()
+        if not daemon.start():
+            self.skipTest("No way to run the Jing daemon in this environment")
+        with tempfile.TemporaryDirectory() as directory:
+            schema, module = os.path.join(directory, "main.rng"), os.path.join(directory, "text.rng")
+            with open(schema, "w") as f:
+                f.write(
+                    '<grammar xmlns="http://relaxng.org/ns/structure/1.0"><start>'
+                    '<externalRef href="text.rng"/></start></grammar>'
+                )
+            with open(module, "w") as f:
+                f.write('<element xmlns="http://relaxng.org/ns/structure/1.0"><anyName/><empty/></element>')
+            self.assertNotEqual(daemon.validate(schema, self.FILES[1], 30).out, b"", "Content should not be allowed")
+
+            with open(module, "w") as f:
+                f.write(
+                    '<grammar xmlns="http://relaxng.org/ns/structure/1.0"><start><ref name="any"/></start>'
+                    '<define name="any"><element><anyName/><zeroOrMore><choice><attribute><anyName/></attribute>'
+                    '<text/><ref name="any"/></choice></zeroOrMore></element></define></grammar>'
+                )
+            self.assertEqual(daemon.validate(schema, self.FILES[1], 30).out, b"", "Changed module should be used")
+
+    def test_unit_daemon(self):
+        """ Test that the unit logs are the same with the daemon """
+        logs = []
+        for daemon in (False, True):
+            HookTest.rng.configure({"daemon": daemon})
+            unit = HookTest.capitains_units.cts.CTSText_TestUnit(self.FILES[2])
+            results = list(unit.epidoc())
+            logs.append((results, unit.dtd_errors, unit.logs))
+        self.assertEqual(logs[0], logs[1], "Results of the daemon should be the same as the command line")
+        self.assertEqual(logs[1][0], [False], "Wrong file should fail")
+
+    def test_slots(self):
+        """ Test that Jing waits for a slot shared by the workers """
+        slots = multiprocessing.BoundedSemaphore(1)
+        HookTest.rng.configure({"slots": slots})
+        slots.acquire()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(HookTest.rng.run_jing(TESTUnit.EPIDOC, self.FILES[1], 30)))
+        thread.start()
+        thread.join(1)
+        self.assertTrue(thread.is_alive(), "Jing should wait for the slot")
+        slots.release()
+        thread.join()
+        self.assertFalse(results[0].timeout, "Waiting for the slot should not count in the timeout")
+        self.assertEqual(results[0].out, b"", "Valid file should not output anything")
+
+    def test_max_errors(self):
+        """ Test that the validation is stopped once the maximum number of errors is reached """
+        with tempfile.NamedTemporaryFile("w", suffix=".xml") as broken:
+            broken.write('<TEI xmlns="http://www.tei-c.org/ns/1.0">{0}</TEI>'.format("<wrong/>\n" * 1000))
+            broken.flush()
+            HookTest.rng.configure({"max_errors": 5})
+            validation = HookTest.rng.run_jing(TESTUnit.EPIDOC, broken.name, 30)
+            self.assertTrue(validation.truncated, "Validation should be stopped")
+            self.assertEqual(len(validation.out.splitlines()), 5, "Only 5 errors should be kept")
+            validation = HookTest.rng.run_jing_batch(TESTUnit.EPIDOC, [broken.name, self.FILES[1]], 30)
+            self.assertTrue(validation[broken.name].truncated, "Validation should be stopped")
+            self.assertEqual(len(validation[broken.name].out.splitlines()), 5, "Only 5 errors should be kept")
+            self.assertFalse(validation[self.FILES[1]].truncated, "Other files should still be validated")
+            daemon = HookTest.rng.JingDaemon()
+            validation = daemon.validate(TESTUnit.EPIDOC, broken.name, 30)
+            self.assertTrue(validation.truncated, "Daemon validation should be stopped")
+            self.assertEqual(len(validation.out.splitlines()), 5, "Only 5 errors should be kept")
+            self.assertEqual(daemon.validate(TESTUnit.EPIDOC, self.FILES[1], 30).out, b"", "Daemon should restart")
+            daemon.stop()
+
+            unit = HookTest.capitains_units.cts.CTSText_TestUnit(broken.name)
+            self.assertEqual(list(unit.epidoc()), [False], "Truncated validation should fail")
+            self.assertEqual(len(unit.dtd_errors), 2, "Errors should be grouped by message")
+            self.assertEqual(unit.dtd_errors[-1], "RelaxNG validation stopped after 5 errors")
+
+            HookTest.rng.configure({"max_errors": 0})
+            validation = HookTest.rng.run_jing(TESTUnit.EPIDOC, broken.name, 30)
+            self.assertFalse(validation.truncated, "Without limit, every error should be kept")
+            self.assertGreater(len(validation.out.splitlines()), 1000)
+
+    def test_unit_background(self):
+        """ Test that the validation runs during the other tests and gives the same results """
+        expected = HookTest.capitains_units.cts.CTSText_TestUnit(self.FILES[2])
+        self.assertEqual(list(expected.epidoc()), [False], "Wrong file should fail")
+        unit = HookTest.capitains_units.cts.CTSText_TestUnit(self.FILES[2])
+        with mock.patch("HookTest.rng.submit", wraps=HookTest.rng.submit) as submit:
+            results = list(unit.test("epidoc", "2.epidoc"))
+            submit.assert_called_once_with(TESTUnit.EPIDOC, self.FILES[2], 30)
+        self.assertEqual(results[-1][:2], ("Epidoc DTD validation", False), "Validation should be reported last")
+        self.assertEqual(unit.dtd_errors, expected.dtd_errors, "Issues should be the same")
+        self.assertEqual(unit.pending, {}, "Started validations should be collected")
+
+        with mock.patch("HookTest.rng.submit") as submit:
+            list(HookTest.capitains_units.cts.CTSText_TestUnit(self.FILES[3]).test("epidoc", "2.epidoc"))
+            submit.assert_not_called()
+
+    def test_unit_result_cache(self):
+        """ Test that an unchanged file is not validated again """
+        with tempfile.TemporaryDirectory() as directory:
+            HookTest.rng.configure({"cache": directory})
+            first = HookTest.capitains_units.cts.CTSText_TestUnit(self.FILES[2])
+            self.assertEqual(list(first.epidoc()), [False], "Wrong file should fail")
+            second = HookTest.capitains_units.cts.CTSText_TestUnit(self.FILES[2])
+            with mock.patch("HookTest.rng.validate") as validate:
+                self.assertEqual(list(second.epidoc()), [False], "Cached result should be used")
+                validate.assert_not_called()
+            self.assertEqual(first.dtd_errors, second.dtd_errors, "Cached issues should be reported")
+            self.assertEqual(first.logs, second.logs, "Cached issues should be logged")
+
+            with mock.patch("HookTest.rng.validate", wraps=HookTest.rng.validate) as validate:
+                list(HookTest.capitains_units.cts.CTSText_TestUnit(self.FILES[2]).tei())
+                self.assertTrue(validate.called, "Another schema should not use the cached result")
+
+    def test_result_cache_modules(self):
+        """ Test that changing a module pulled in by a schema invalidates the cached results """
+        with tempfile.TemporaryDirectory() as directory:
+            HookTest.rng.configure({"cache": os.path.join(directory, "cache")})
+            os.makedirs(os.path.join(directory, "modules"))
+            schema, module = os.path.join(directory, "main.rng"), os.path.join(directory, "modules", "text.rng")
+            with open(schema, "w") as f:
+                f.write(
+                    '<grammar xmlns="http://relaxng.org/ns/structure/1.0"><start>'
+                    '<externalRef href="modules/text.rng"/></start></grammar>'
+                )
+            with open(module, "w") as f:
+                f.write('<element xmlns="http://relaxng.org/ns/structure/1.0"><anyName/><empty/></element>')
+            self.assertEqual(HookTest.rng.references(schema), [module], "Module should be found")
+            HookTest.rng.store(schema, self.FILES[1], True, [])
+            self.assertEqual(HookTest.rng.cached(schema, self.FILES[1]), {"status": True, "dtd_errors": []})
+
+            with open(module, "a") as f:
+                f.write("\n")
+            self.assertIsNone(HookTest.rng.cached(schema, self.FILES[1]), "Changed module should not use the cache")
+
+
+class TestWarmup(unittest.TestCase):
+    """ Test the JVM settings saved by hooktest-warmup
+    """
+    def setUp(self):
+        self.settings = dict(HookTest.rng.SETTINGS)
+        self.directory = tempfile.TemporaryDirectory()
+        HookTest.rng.configure({"jvm": os.path.join(self.directory.name, "jvm")})
+
+    def tearDown(self):
+        HookTest.rng.configure(self.settings)
+        self.directory.cleanup()
+
+    def test_warmup(self):
+        """ Test that Jing calls use the saved settings and give the same output """
+        path = TestJing.FILES[2]
+        plain = HookTest.rng.run_jing(TESTUnit.EPIDOC, path, 30)
+        self.assertEqual(HookTest.rng.java(), HookTest.rng.JAVA, "Without warmup, java should not be tuned")
+
+        settings = HookTest.rng.warmup()
+        self.assertEqual(
+            HookTest.rng.java(), HookTest.rng.JAVA + settings["share"] + settings["options"],
+            "Saved settings should be used"
+        )
+        self.assertEqual(
+            HookTest.rng.java(tuned=False), HookTest.rng.JAVA + settings["share"],
+            "Long-lived processes should only share classes"
+        )
+        tuned = HookTest.rng.run_jing(TESTUnit.EPIDOC, path, 30)
+        self.assertEqual((tuned.out, tuned.error), (plain.out, plain.error), "Output should not change")
+        with mock.patch("HookTest.rng._run", wraps=HookTest.rng._run) as run:
+            HookTest.rng.run_jing_batch(TESTUnit.EPIDOC, TestJing.FILES[1:3], 30)
+        command = run.call_args[0][0]
+        self.assertEqual(
+            command[:len(HookTest.rng.java(tuned=False)) + 1], HookTest.rng.java(tuned=False) + ["-jar"],
+            "Batches should only share classes"
+        )
+
+    def test_other_java(self):
+        """ Test that settings saved for another java are ignored """
+        HookTest.rng.warmup()
+        with mock.patch("HookTest.rng._java_version", return_value="/other/java:0:0"):
+            HookTest.rng._JVM.clear()
+            self.assertEqual(HookTest.rng.java(), HookTest.rng.JAVA, "Settings of another JVM should be ignored")
+        HookTest.rng._JVM.clear()
+
+
+class TestLxml(unittest.TestCase):
+    """ Test the in-process RelaxNG engine
+    """
+    def setUp(self):
+        self.settings = dict(HookTest.rng.SETTINGS)
+        HookTest.rng.configure({"cache": None, "daemon": False, "engine": "lxml"})
+
+    def tearDown(self):
+        HookTest.rng.configure(self.settings)
+
+    def test_unit_lxml(self):
+        """ Test that lxml issues are reported like the ones of Jing """
+        unit = HookTest.capitains_units.cts.CTSText_TestUnit(TestJing.FILES[2])
+        self.assertEqual(list(unit.epidoc()), [False], "Wrong file should fail")
+        self.assertEqual(
+            unit.dtd_errors,
+            [" error: Did not expect element should_fail_whatever_this_should_be there [In (L5 C0)]"],
+            "Issues should be formatted with their position"
+        )
+        unit = HookTest.capitains_units.cts.CTSText_TestUnit(TestJing.FILES[1])
+        self.assertEqual(list(unit.epidoc()), [True], "Valid file should pass")
+        self.assertEqual(unit.dtd_errors, [], "Valid file should not have issues")
+
+    def test_unit_lxml_tree(self):
+        """ Test that the tree parsed for the validation is used by the other tests """
+        unit = HookTest.capitains_units.cts.CTSText_TestUnit(TestJing.FILES[1])
+        list(unit.epidoc())
+        tree = unit.xml
+        self.assertIsNotNone(tree, "Tree should be parsed by the RelaxNG test")
+        self.assertEqual(list(unit.parsable()), [True], "File should be parsable")
+        self.assertIs(unit.xml, tree, "File should not be parsed twice")
+
+    def test_lxml_schema_cache(self):
+        """ Test that schemas are compiled once per process """
+        HookTest.rng.stats()
+        with mock.patch.dict(HookTest.rng._RELAXNG, clear=True):
+            for path in TestJing.FILES[:3]:
+                HookTest.rng.run_lxml(TESTUnit.EPIDOC, path)
+        self.assertEqual(HookTest.rng.stats(), {"hits": 2, "misses": 1}, "Schema should be compiled once")
+
+    def test_lxml_fatal(self):
+        """ Test that files which cannot be read are failed """
+        with tempfile.NamedTemporaryFile(suffix=".xml") as broken:
+            broken.write(b"<TEI><teiHeader></TEI>")
+            broken.flush()
+            validation = HookTest.rng.validate(TESTUnit.EPIDOC, broken.name, 30)
+            self.assertEqual(
+                list(TESTUnit.relaxng_logs(validation.issues)),
+                [" fatal: Opening and ending tag mismatch: teiHeader line 1 and TEI [In (L1 C23)]"],
+                "Parsing errors should be reported as fatal"
+            )
+        validation = HookTest.rng.validate(TESTUnit.EPIDOC, TestJing.FILES[3], 30)
+        self.assertIsInstance(validation.exception, OSError, "Missing file should raise")
+
+    def test_lxml_fallback(self):
+        """ Test that schemas lxml cannot compile are run through Jing """
+        with mock.patch("HookTest.rng.run_jing") as run_jing:
+            HookTest.rng.validate("tests/test_auto_rng/data/hafez/__cts__.xml", TestJing.FILES[1], 30)
+            run_jing.assert_called_once_with("tests/test_auto_rng/data/hafez/__cts__.xml", TestJing.FILES[1], 30)
+
+
+class TestFetch(unittest.TestCase):
+    """ Test the download of remote RNG against a local HTTP server
+    """
+    def setUp(self):
+        self.settings = dict(HookTest.rng.SETTINGS)
+        self.directory = tempfile.TemporaryDirectory()
+        HookTest.rng.configure({"schemas": self.directory.name, "offline": False, "catalogs": [], "failed": {}})
+        with open(TESTUnit.EPIDOC, "rb") as f:
+            content = f.read()
+        requested = self.requested = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                requested.append(self.path)
+                if self.path != "/epidoc.rng":
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:{0}/epidoc.rng".format(self.server.server_port)
+        self.content = content
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+        HookTest.rng.configure(self.settings)
+
+    def test_fetch_concurrent(self):
+        """ Test that concurrent fetches of the same RNG download it once """
+        paths = []
+        threads = [
+            threading.Thread(target=lambda: paths.append(HookTest.rng.fetch(self.url, 30)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(paths)), 1, "Every fetch should give the same file")
+        self.assertEqual(len(paths), 8, "Every fetch should succeed")
+        self.assertEqual(self.requested, ["/epidoc.rng"], "RNG should be downloaded once")
+        with open(paths[0], "rb") as f:
+            self.assertEqual(f.read(), self.content, "Complete RNG should be stored")
+
+    def test_fetch_error(self):
+        """ Test that failed downloads leave nothing behind """
+        with self.assertRaises(requests.HTTPError):
+            HookTest.rng.fetch(self.url + ".missing", 30)
+        self.assertEqual(
+            [name for name in os.listdir(self.directory.name) if not name.endswith(".lock")], [],
+            "Nothing should be stored"
+        )
+
+    def test_fetch_failed_once(self):
+        """ Test that a failed download is not tried again during the run """
+        with self.assertRaises(requests.HTTPError):
+            HookTest.rng.fetch(self.url + ".missing", 30)
+        with self.assertRaises(EnvironmentError):
+            HookTest.rng.fetch(self.url + ".missing", 30)
+        self.assertEqual(self.requested, ["/epidoc.rng.missing"], "Failed RNG should be requested once")
+        HookTest.rng.fetch(self.url, 30)
+        self.assertEqual(self.requested, ["/epidoc.rng.missing", "/epidoc.rng"], "Other RNG should be downloaded")
+
+    def test_fetch_offline(self):
+        """ Test that offline fetches only use previous downloads """
+        HookTest.rng.configure({"offline": True})
+        with self.assertRaises(EnvironmentError):
+            HookTest.rng.fetch(self.url, 30)
+        HookTest.rng.configure({"offline": False})
+        path = HookTest.rng.fetch(self.url, 30)
+        HookTest.rng.configure({"offline": True})
+        self.assertEqual(HookTest.rng.fetch(self.url, 30), path, "Downloaded RNG should be used")
+        self.assertEqual(self.requested, ["/epidoc.rng"], "Offline fetches should not reach the server")
+
+    def test_fetch_catalog(self):
+        """ Test that URLs of the catalogs are never downloaded """
+        HookTest.rng.configure({"offline": True})
+        self.assertTrue(
+            os.path.samefile(
+                HookTest.rng.fetch(
+                    "https://www.tei-c.org/Vault/P5/3.0.0/xml/tei/custom/schema/relaxng/tei_all.rng", 30
+                ),
+                TESTUnit.TEI_ALL
+            ),
+            "Bundled catalog should give the RNG shipped with HookTest"
+        )
+        with self.assertRaises(EnvironmentError, msg="Moving URLs should not be mapped to the bundled RNG"):
+            HookTest.rng.fetch("http://www.stoa.org/epidoc/schema/latest/tei-epidoc.rng", 30)
+        catalog = os.path.join(self.directory.name, "catalog.json")
+        with open(catalog, "w") as f:
+            f.write('{{"{0}": "local/epidoc.rng"}}'.format(self.url))
+        HookTest.rng.configure({"offline": False, "catalogs": [catalog]})
+        self.assertEqual(
+            HookTest.rng.fetch(self.url, 30), os.path.join(self.directory.name, "local", "epidoc.rng"),
+            "Paths of catalog files should be relative to them"
+        )
+        self.assertEqual(self.requested, [], "Nothing should be downloaded")
+
+    def test_prefetch(self):
+        """ Test that the remote RNG of texts are downloaded before the tests """
+        with tempfile.TemporaryDirectory() as repository:
+            for name in ("a", "b"):
+                with open(os.path.join(repository, name + ".xml"), "w") as f:
+                    f.write('<?xml-model href="{0}"?><TEI xmlns="http://www.tei-c.org/ns/1.0"/>'.format(self.url))
+            test = HookTest.test.Test(repository, scheme="auto", cache_dir=self.directory.name)
+            test.text_files = [os.path.join(repository, name + ".xml") for name in ("a", "b")]
+            HookTest.rng.configure(test.rng_options)
+            test.prefetch()
+        self.assertEqual(self.requested, ["/epidoc.rng"], "RNG should be downloaded once")
+        self.assertEqual(
+            [name for name in os.listdir(os.path.join(self.directory.name, "schemas")) if name.endswith(".rng")],
+            [os.path.basename(HookTest.rng.fetch(self.url, 30))],
+            "RNG should be stored in the schema directory"
+        )
@@ -1,5 +1,6 @@
 import HookTest.test
 import HookTest.cmd
+from HookTest.units import TESTUnit
 from unittest import TestCase
 from io import StringIO  # Python3
 import json
@@ -7,6 +8,7 @@ import sys
 import os
 import shutil
 import re
+import glob
 from colors import white, magenta
 import os
 
@@ -136,16 +138,19 @@ class TestProcess(TestCase):
         ####
         #
         #   Test on false.xml
-        #   Is bad formatted XML + provoke a fatal in RNG
+        #   Is bad formatted XML : RNG is failed without running
         #
         ####
         text = self.filter(parsed, "/data/tlg2255/perseus001/false.xml")
         self.assertFalse(text["status"], "Text false.xml should not pass")
         self.assertFalse(text["units"]["File parsing"], "It should not be parsable")
+        self.assertFalse(text["units"]["Epidoc DTD validation"], "RNG should fail when the file is not parsable")
         self.assertIn(
-            '>>>>>> fatal: The element type "text" must be terminated by the matching end-tag "</text>". [In (L236 C22)]',
-            text["logs"], "Fatal error should be parsed"
+            ">>>>>> <class 'lxml.etree.XMLSyntaxError'> : Opening and ending tag mismatch: text line 236 and TEI, "
+            "line 236, column 26 (false.xml, line 236)",
+            text["logs"], "Parsing error should be logged"
         )
+        self.assertEqual(text["dtd_errors"], [], "Jing should not run on a file which is not parsable")
 
         ####
         #
@@ -251,6 +256,29 @@ class TestProcess(TestCase):
         )
         self.assertEqual(status, "failed", "Test should fail")
 
+    def test_run_local_console_recycle(self):
+        """ Test a run with workers replaced after each task and above the memory watermark """
+        status, logs = self.hooktest([
+            "./tests/repo1", "--console", "--scheme", "tei", "--workers", "1", "--recycle", "1", "--max-memory", "1"
+        ])
+        self.assertLogResult(logs, "Metadata Files", "2", "2 metadata files should be described in logs")
+        self.assertLogResult(logs, "Total Texts", "3", "3 texts should be described in logs")
+        self.assertLogResult(logs, "Passing Metadata", "2", "Metadata results should not change")
+        self.assertRegex(logs, r"\|\s+Worker Recycling\s+\|\s+\d+ pools replaced above 1MB", "Recycling should be shown")
+        self.assertEqual(status, "failed", "Test should fail")
+
+    def test_run_local_console_executors(self):
+        """ Test that threads and the serial executor give the results of processes """
+        for executor in ("thread", "serial"):
+            status, logs = self.hooktest([
+                "./tests/repo1", "--console", "--scheme", "tei", "--workers", "2", "--executor", executor
+            ])
+            self.assertLogResult(logs, "Metadata Files", "2", "2 metadata files should be described in logs")
+            self.assertLogResult(logs, "Passing Metadata", "2", "2 metadata files should be passing in logs")
+            self.assertLogResult(logs, "Total Texts", "3", "3 texts should be described in logs")
+            self.assertLogResult(logs, "Passing Texts", "0", "3 texts should not be passing in logs")
+            self.assertEqual(status, "failed", "Test should fail")
+
     def test_run_local_console_verbose(self):
         """ Test a run on the local tests passages with console print and verbose """
         status, logs = self.hooktest(["./tests/repo1", "--console", "--verbose", "--scheme", "tei"])
@@ -309,7 +337,8 @@ class TestProcess(TestCase):
     def test_run_local_console_verbose_auto_rng(self):
         """ Test a run on the local tests passages with console print while automatically detecting downloading the correct remote rng """
         status, logs = self.hooktest([
-            "./tests/test_auto_rng", "--console", "--verbose", "--scheme", "auto", "--guidelines", "2.epidoc"])
+            "./tests/test_auto_rng", "--console", "--verbose", "--scheme", "auto", "--guidelines", "2.epidoc",
+            "--cache-dir", temp_dir_path("cache")])
         self.assertLogResult(
             logs, "Metadata Files", "2",
             "2 metadata files should be described in logs"
@@ -336,7 +365,6 @@ class TestProcess(TestCase):
         self.assertEqual(result, ['Automatic RNG validation'], "RNG validation should fail with invalid file path")
 
         self.assertEqual(status, "failed", "Test should fail")
-        shutil.rmtree('./.rngs/')
 
     def test_run_local_console_verbose_no_scheme(self):
         """ Test a run on the local tests passages with console print with no RNG run """
@@ -404,27 +432,28 @@ auto: Automatically detect the RNG to use from the xml-model declaration in each
             status, logs = self.hooktest([
                 "./tests/repo1", "--console", "--verbose", "--scheme", os.path.abspath("wrong/path"), "--guidelines", "2.epidoc"])
 
-    def test_run_local_console_verbose_remote_download_timeout_and_use_existing_rng(self):
-        """ Test that the download of a remote RNG will timeout after the period set in the --timeout argument
-            And then est that a run with --scheme auto will use an existing local download if it has previously been downloaded
-            I have joined these two tests because I think Travis runs them concurrently and one interferes with the other
+    def test_run_local_console_verbose_offline_and_use_existing_rng(self):
+        """ Test that an offline run fails texts whose remote RNG was never downloaded
+            And then test that a run with --scheme auto will use an existing local download if it has previously been downloaded
         """
-        os.makedirs('.rngs', exist_ok=True)
-        with open('.rngs/af2245c1fd91fabf76516bb0b9332a90.rng-indownload', mode="w") as f:
-            f.write("Downloading...")
-        message = "The download of the RNG took too long"
+        cache = temp_dir_path("cache")
         status, logs = self.hooktest([
-            "./tests/test_auto_rng", "--console", "--verbose", "--scheme", 'auto', "--guidelines", "2.epidoc", "--timeout", "1"])
-        self.assertIn('OSError: The download of the RNG took too long', logs, "The Error should show up in the logs")
-        shutil.rmtree('./.rngs')
-        os.makedirs('.rngs', exist_ok=True)
-        with open('.rngs/af2245c1fd91fabf76516bb0b9332a90.rng', mode="w") as f:
+            "./tests/test_auto_rng", "--console", "--verbose", "--scheme", 'auto', "--guidelines", "2.epidoc",
+            "--cache-dir", cache, "--offline"])
+        self.assertIn(
+            "https://digitallatin.github.io/guidelines/critical-editions.rng was never downloaded and HookTest is offline",
+            logs, "The Error should show up in the logs"
+        )
+        node_count, result = self.parse_subset(logs, "hafez.divan.perseus-far1.xml")
+        self.assertEqual(result, ['Automatic RNG validation'], "RNG validation should fail without the RNG")
+        os.makedirs(os.path.join(cache, "schemas"), exist_ok=True)
+        with open(os.path.join(cache, "schemas", "af2245c1fd91fabf76516bb0b9332a90.rng"), mode="w") as f:
             f.write("Downloading...")
         status, logs = self.hooktest([
-            "./tests/test_auto_rng", "--console", "--verbose", "--scheme", 'auto', "--guidelines", "2.epidoc", "--timeout", "1"])
+            "./tests/test_auto_rng", "--console", "--verbose", "--scheme", 'auto', "--guidelines", "2.epidoc",
+            "--cache-dir", cache, "--offline"])
         self.assertIn("fatal: Content is not allowed in prolog. [In (L1 C1)]", logs,
                       "Since the created RNG file has no content, this error shows that this RNG was used.")
-        shutil.rmtree('./.rngs')
 
     def test_run_filter(self):
         """ Test a run on the local testFilers Repo with json
@@ -467,6 +496,29 @@ auto: Automatically detect the RNG to use from the xml-model declaration in each
         )
         self.assertEqual(len(parsed["units"]), 4, "There should be 4 tests : two texts, two metadata")
 
+    def test_run_countwords_large_file(self):
+        """ Test that texts checked as large files give the same words count and report their strategy
+
+        """
+        json_file = temp_dir_path("repocount.json")
+        status, logs = self.hooktest([
+            "./tests/repoFilters", "--console",
+            "--scheme", "epidoc", "--verbose",
+            "--json", json_file,
+            "--filter", "stoa0255.stoa004",
+            "--countwords", "--large-file", "0"
+        ])
+        parsed = self.read_logs(json_file)
+        self.assertEqual(
+            sum([w["words"] for w in parsed["units"] if "words" in w]), 12830, "12830 Words should be found"
+        )
+        self.assertEqual(
+            [w["strategy"] for w in parsed["units"] if "words" in w], ["huge", "huge"],
+            "Texts should be parsed with a huge tree parser"
+        )
+        self.assertLogResult(logs, "Parsing Strategies", "0 tree / 2 huge", "Strategies should be shown")
+        self.assertIn("Large texts parsed with a huge tree parser:", logs, "Large texts should be listed")
+
     def test_run_tei_errors(self):
         """ Test a run on the local error TEI Repo with console print
 
@@ -534,6 +586,50 @@ auto: Automatically detect the RNG to use from the xml-model declaration in each
         )
         self.assertFalse(text["status"], "Wrongly formated URNS or not descendants should not pass")
 
+    def test_run_tei_errors_rng_backends(self):
+        """ Test that the RNG daemon and batches report the same thing as one java call per file """
+        reports = []
+        for options in ([], ["--rng-daemon"], ["--rng-batch", "5"], ["--rng-batch", "2", "--workers", "2"]):
+            json_file = temp_dir_path("repotei.json")
+            self.hooktest([
+                "./tests/repotei", "--scheme", "tei", "--verbose", "--json", json_file, "--no-rng-cache"
+            ] + options)
+            reports.append({
+                unit["name"]: (unit["units"], unit.get("dtd_errors"), unit["logs"])
+                for unit in self.read_logs(json_file)["units"]
+            })
+        for report in reports[1:]:
+            self.assertEqual(reports[0], report, "Daemon, batches and command line should give the same report")
+
+    def test_run_tei_rng_cache_summary(self):
+        """ Test that the use of compiled schemas is summed up at the end of the run """
+        status, logs = self.hooktest([
+            "./tests/repotei", "--console", "--scheme", "tei", "--workers", "1", "--rng-batch", "5", "--no-rng-cache"
+        ])
+        self.assertLogResult(
+            logs, "RNG Schema Cache", "1 hits / 1 misses",
+            "Files of a batch should share the compiled schema"
+        )
+
+    def test_run_tei_rng_result_cache(self):
+        """ Test that a second run reuses the RelaxNG results of the first one """
+        reports = []
+        for _ in range(2):
+            json_file = temp_dir_path("repotei.json")
+            self.hooktest([
+                "./tests/repotei", "--scheme", "tei", "--verbose", "--json", json_file,
+                "--cache-dir", temp_dir_path("cache")
+            ])
+            reports.append({
+                unit["name"]: (unit["units"], unit.get("dtd_errors"), unit["logs"])
+                for unit in self.read_logs(json_file)["units"]
+            })
+        self.assertEqual(reports[0], reports[1], "Cached results should give the same report")
+        self.assertEqual(
+            len(glob.glob(temp_dir_path("cache", "rng", "*", "*.json"))), 2,
+            "Result of each text validated by Jing should be stored"
+        )
+
     def test_run_local_greek(self):
         """ Test a run cloning a known working repository (PerseusDL/canonical-farsiLit)"""
         status, logs = self.hooktest([
@@ -556,6 +652,57 @@ auto: Automatically detect the RNG to use from the xml-model declaration in each
             "3 texts should not be passing in logs"
         )
 
+    def test_run_local_greek_auto_offline(self):
+        """ Test that the latest EpiDoc is only taken from a local RNG when a catalog maps it """
+        status, logs = self.hooktest([
+            "./tests/greek", "--console", "--verbose", "--scheme", "auto", "--guidelines", "2.epidoc", "--offline",
+            "--cache-dir", temp_dir_path("cache")
+        ])
+        self.assertLogResult(
+            logs, "Passing Texts", "0",
+            "Latest EpiDoc should not be replaced by the bundled RNG"
+        )
+
+        catalog = temp_dir_path("catalog.json")
+        with open(catalog, "w") as f:
+            json.dump({"http://www.stoa.org/epidoc/schema/latest/tei-epidoc.rng": os.path.abspath(TESTUnit.EPIDOC)}, f)
+        status, logs = self.hooktest([
+            "./tests/greek", "--console", "--verbose", "--scheme", "auto", "--guidelines", "2.epidoc", "--offline",
+            "--cache-dir", temp_dir_path("cache"), "--catalog", catalog
+        ])
+        self.assertLogResult(
+            logs, "Passing Texts", "1",
+            "Text using the latest EpiDoc should be validated without network with a catalog"
+        )
+
+    def test_run_local_repo_errors_inventory(self):
+        """ Test that metadata entries without text are reported """
+        json_file = temp_dir_path("repo2.json")
+        status, logs = self.hooktest(["./tests/repo2", "--console", "--scheme", "ignore", "--verbose", "--json", json_file])
+        parsed = self.read_logs(json_file)
+        self.assertEqual(parsed["inventory"], {"orphans": [], "missing": [{
+            "urn": "urn:cts:greekLit:tlg2255.perseus001.perseus-grc1", "metadata": "/data/wrongmetadata/wrongmetadata/__cts__.xml"
+        }]}, "Metadata entries without text should be in the report")
+        self.assertLogResult(
+            logs, "Inventory", "0 texts without metadata / 1 metadata without text", "Inventory should be summed up"
+        )
+        self.assertIn("Metadata without text:", logs, "Metadata entries without text should be listed")
+
+    def test_run_local_repo_errors_rng_last(self):
+        """ Test that --rng-last only validates texts passing every other test """
+        json_file = temp_dir_path("repo2.json")
+        self.hooktest([
+            "./tests/repo2", "--scheme", "epidoc", "--verbose", "--json", json_file, "--rng-last", "--no-rng-cache"
+        ])
+        parsed = self.read_logs(json_file)
+        text = self.filter(parsed, "/data/tlg2255/perseus001/subreference.xml")
+        self.assertFalse(text["units"]["Epidoc DTD validation"], "RNG should be failed when other tests fail")
+        self.assertIn(">>>>>> RelaxNG validation skipped because other tests failed", text["logs"])
+        self.assertEqual(list(text["units"])[-1], "Epidoc DTD validation", "RNG should be the last test")
+        text = self.filter(parsed, "/data/tlg2255/perseus001/tlg2255.perseus001.perseus-grc1.xml")
+        self.assertTrue(text["units"]["Epidoc DTD validation"], "RNG should run when other tests pass")
+        self.assertTrue(text["status"], "Text tlg2255.p001.grc1 should pass")
+
     def test_run_local_greek_count_word_raise(self):
         """ Test a run cloning a known working repository (PerseusDL/canonical-farsiLit)"""
         status, logs = self.hooktest([
@@ -1,5 +1,6 @@
 import unittest
 import HookTest.test
+import HookTest.executors
 import HookTest.units
 import mock
 import json
@@ -416,7 +417,8 @@ class TestTest(unittest.TestCase):
         # UnitInstance is a mock which has a test method is a mock
         UnitInstance = mock.Mock(
             test=test, forbiddens=['forbid'], duplicates=['duplicate'], citation=['citation'], lang="grc",
-            dtd_errors=['dtd_errors'], capitains_errors=['capitains_errors'], empties=["empties"]
+            dtd_errors=['dtd_errors'], capitains_errors=['capitains_errors'], empties=["empties"],
+            document=mock.Mock(strategy="tree")
         )
         # ctsunit is a mock of the class CTSText_TestUnit and will return the instance UnitInstance
         ctsunit = mock.Mock(
@@ -424,7 +426,10 @@ class TestTest(unittest.TestCase):
         )
         with mock.patch("HookTest.test.HookTest.capitains_units.cts.CTSText_TestUnit", ctsunit):
             logs, filepath, additional = self.test.unit("/phi1294/phi002/phi1294.phi002.perseus-lat2.xml")
-            ctsunit.assert_called_with("/phi1294/phi002/phi1294.phi002.perseus-lat2.xml", countwords=False, timeout=30)
+            ctsunit.assert_called_with(
+                "/phi1294/phi002/phi1294.phi002.perseus-lat2.xml", countwords=False, timeout=30,
+                large_file=HookTest.document.LARGE_FILE
+            )
             self.assertIn(">>>> Testing /phi1294/phi002/phi1294.phi002.perseus-lat2.xml", logs.logs)
             self.assertIn(">>>>> MyCapytain passed", logs.logs)
             self.assertIn(">>>>> Folder Name passed", logs.logs)
@@ -441,6 +446,7 @@ class TestTest(unittest.TestCase):
                 'dtd_errors': ['dtd_errors'],
                 'capitains_errors': ['capitains_errors'],
                 'empties': ['empties'],
+                'strategy': 'tree',
                 'units': {
                     'Folder Name': True,
                     'MyCapytain': True
@@ -465,14 +471,18 @@ class TestTest(unittest.TestCase):
         ]
         INVObject = mock.Mock(
             test=test, forbiddens=['forbid'], duplicates=['duplicate'], citation=['citation'], lang="grc",
-            dtd_errors=['dtd_errors'], capitains_errors=['capitains_errors'], empties=["empties"]
+            dtd_errors=['dtd_errors'], capitains_errors=['capitains_errors'], empties=["empties"],
+            document=mock.Mock(strategy="tree")
         )
         ctsunit = mock.Mock(
             return_value=INVObject
         )
         with mock.patch("HookTest.test.HookTest.capitains_units.cts.CTSText_TestUnit", ctsunit):
             logs, filepath, additional = self.test.unit("/phi1294/phi002/phi1294.phi002.perseus-lat2.xml")
-            ctsunit.assert_called_with("/phi1294/phi002/phi1294.phi002.perseus-lat2.xml", countwords=False, timeout=30)
+            ctsunit.assert_called_with(
+                "/phi1294/phi002/phi1294.phi002.perseus-lat2.xml", countwords=False, timeout=30,
+                large_file=HookTest.document.LARGE_FILE
+            )
             self.assertIn(">>>> Testing /phi1294/phi002/phi1294.phi002.perseus-lat2.xml", logs.logs)
             self.assertIn(">>>>> MyCapytain passed", logs.logs)
             self.assertIn(">>>>> Folder Name failed", logs.logs)
@@ -490,6 +500,7 @@ class TestTest(unittest.TestCase):
                 'dtd_errors': ['dtd_errors'],
                 'capitains_errors': ['capitains_errors'],
                 'empties': ['empties'],
+                'strategy': 'tree',
                 'units': {
                     'Folder Name': False,
                     'MyCapytain': True
@@ -567,6 +578,39 @@ class TestTest(unittest.TestCase):
         self.assertEqual(len(metadata), 2, "It should find two __cts__ in repo1")
         self.assertEqual(len(reading), 3, "It should find three texts in repo1")  # eng far ger
 
+    def test_chunks_auto_rng(self):
+        """ Test that texts are grouped by schema in auto mode and that each group is validated by one Jing call """
+        os.makedirs(self.TESTDIR)
+        for name in ("one", "two"):
+            shutil.copy(HookTest.units.TESTUnit.EPIDOC, os.path.join(self.TESTDIR, name + ".rng"))
+        texts = []
+        for text, schema in (("a", "one"), ("b", "two"), ("c", "one"), ("d", "one")):
+            texts.append(os.path.join(self.TESTDIR, text + ".xml"))
+            with open(texts[-1], "w") as f:
+                f.write('<?xml-model href="{0}.rng"?><TEI xmlns="http://www.tei-c.org/ns/1.0"/>'.format(schema))
+
+        test = HookTest.test.Test(self.TESTDIR, scheme="auto", workers=1, rng_batch=2)
+        test.start()
+        self.assertEqual(
+            test.chunks(texts), [[texts[0], texts[2]], [texts[3]], [texts[1]]],
+            "Texts should be grouped by schema"
+        )
+        one = os.path.abspath(os.path.join(self.TESTDIR, "one.rng"))
+        with mock.patch("HookTest.rng.run_jing_batch", return_value={}) as batch:
+            test.units([texts[0], texts[2]])
+            batch.assert_called_once_with(one, [texts[0], texts[2]], test.timeout)
+
+    def test_slots(self):
+        """ Test that Jing processes are limited across workers only when there are less slots than workers """
+        test = HookTest.test.Test("./", workers=4, rng_slots=2)
+        slots = test.slots()
+        self.assertIsNotNone(slots, "Workers should share two slots")
+        self.assertTrue(slots.acquire(False) and slots.acquire(False), "Two slots should be available")
+        self.assertFalse(slots.acquire(False), "Third Jing process should wait")
+        self.assertIsNone(HookTest.test.Test("./", workers=4, rng_slots=4).slots(), "Each worker has its slot")
+        with mock.patch("HookTest.rng.available_slots", return_value=1):
+            self.assertIsNotNone(HookTest.test.Test("./", workers=2).slots(), "Memory should limit Jing processes")
+
     def test_cover(self):
         """ Test covering dict generation """
         test = {
@@ -1177,6 +1221,140 @@ class TestTest(unittest.TestCase):
             "Headers should say json and have a good secure"
         )
 
+    def test_map_recycling(self):
+        """ Test that workers are replaced above the memory watermark without losing or repeating tasks """
+        test = HookTest.test.Test("", workers=2, recycle=1, max_memory=1)
+        self.assertEqual(
+            sorted(test.map(len, ["a" * i for i in range(20)])), list(range(20)),
+            "Every task should be run once"
+        )
+        self.assertGreater(test.recycled, 0, "Pools should be replaced")
+        self.assertLess(test.recycled, 20, "Tasks running when the watermark is reached should finish in the same pool")
+
+        test = HookTest.test.Test("", workers=2)
+        self.assertEqual(sorted(test.map(len, ["a" * i for i in range(20)])), list(range(20)))
+        self.assertEqual(test.recycled, 0, "Pools should not be replaced without a watermark")
+
+    def test_map_executors(self):
+        """ Test that every executor runs each task once and that only processes are recycled """
+        for executor in HookTest.executors.EXECUTORS:
+            test = HookTest.test.Test("", workers=2, recycle=1, max_memory=1, executor=executor)
+            self.assertEqual(
+                sorted(test.map(len, ["a" * i for i in range(20)])), list(range(20)),
+                "Every task should be run once by " + executor
+            )
+            self.assertEqual(test.recycled > 0, executor == "process", "Only processes should be recycled")
+
+        with mock.patch("HookTest.test.WORKER", None):
+            test = HookTest.test.Test("tests/repo1", scheme="tei", executor="serial")
+            results = list(test.map(HookTest.test.unit, ["tests/repo1/data/hafez/__cts__.xml"]))
+            self.assertIsInstance(HookTest.test.WORKER, HookTest.test.Test, "Serial tasks should run in the process")
+        self.assertEqual(results[0][1], "tests/repo1/data/hafez/__cts__.xml")
+
+        with self.assertRaises(ValueError):
+            list(HookTest.test.Test("", executor="fibers").map(len, ["a"]))
+
+    def test_worker_settings(self):
+        """ Test that workers get the settings once and tasks only carry the paths of the files """
+        test = HookTest.test.Test("tests/repo1", scheme="tei", countwords=True)
+        test.results = unitlog_dict()
+        test.inventory.add("urn:cts:farsiLit:hafez.divan.perseus-eng1")
+        settings = test.settings()
+        self.assertEqual(settings.results, OrderedDict(), "Results should not be sent to the workers")
+        self.assertEqual(len(settings.inventory), 0, "Inventory should be resolved by the parent")
+        self.assertEqual(len(test.results), 2, "Results of the test should be kept")
+
+        with mock.patch("HookTest.test.WORKER", None):
+            HookTest.test.initialize(settings, dict(test.rng_options, slots=None))
+            self.assertIs(HookTest.test.WORKER, settings)
+            result, filepath, additional = HookTest.test.unit("tests/repo1/data/hafez/__cts__.xml")
+        self.assertEqual(filepath, "tests/repo1/data/hafez/__cts__.xml")
+        self.assertTrue(result.status, "Metadata should be tested with the settings of the test")
+
+    def test_run_missing_metadata_result(self):
+        """ Test that texts waiting for the metadata are reported when a metadata file gives no result """
+        test = HookTest.test.Test("tests/repo1", scheme="ignore", executor="serial")
+        tested = HookTest.test.units
+
+        def texts_only(filepaths):
+            results, stats = tested(filepaths)
+            return [result for result in results if not result[1].endswith("__cts__.xml")], stats
+
+        with mock.patch("HookTest.test.units", texts_only):
+            test.run()
+        self.assertEqual(sorted(test.results), sorted(test.text_files), "Every text should be reported")
+
+    @mock.patch("HookTest.test.time.strftime", return_value="Time")
+    def test_resolve(self, time_mocked):
+        """ Test that the inventory test of texts is resolved where the unit would have run it """
+        result = self.test.cover("/tlg0001/tlg0001.tlg001.perseus-grc1.xml", OrderedDict([
+            ("File parsing", True), ("URN informations", True), ("Naming conventions", True)
+        ]), testtype="CTSText", logs=[
+            ">>>> Testing /tlg0001/tlg0001.tlg001.perseus-grc1.xml", ">>>>> File parsing passed",
+            ">>>>> URN informations passed", ">>>>>> URN found", ">>>>> Naming conventions passed"
+        ], additional={"language": "grc"}, positions=[1, 2, 4])
+        self.test.inventory.add("urn:cts:greekLit:tlg0001.tlg001.perseus-grc1", "/tlg0001/tlg001/__cts__.xml")
+
+        resolved = self.test.resolve(result, "urn:cts:greekLit:tlg0001.tlg001.perseus-grc1")
+        self.assertEqual(
+            list(resolved.units.items()),
+            [("File parsing", True), ("URN informations", True), ("Available in inventory", True),
+             ("Naming conventions", True)]
+        )
+        self.assertEqual(resolved.logs[4:], [">>>>> Available in inventory passed", ">>>>> Naming conventions passed"])
+        self.assertEqual((resolved.status, resolved.coverage, resolved.additional), (True, 100.0, {"language": "grc"}))
+
+        resolved = self.test.resolve(result, "urn:cts:greekLit:tlg0001.tlg002.perseus-grc1")
+        self.assertEqual((resolved.status, resolved.coverage), (False, 75.0), "Text missing from inventory should fail")
+        self.assertIn(">>>>> Available in inventory failed", resolved.logs)
+        self.assertFalse(self.test.resolve(result, None).status, "Text without URN should fail")
+        self.test.text_files = ["/tlg0001/tlg0001.tlg001.perseus-grc1.xml"]
+        self.assertEqual(
+            self.test.orphans(),
+            ([("/tlg0001/tlg0001.tlg001.perseus-grc1.xml", "urn:cts:greekLit:tlg0001.tlg002.perseus-grc1")], []),
+            "Text with a URN missing from the inventory should be reported, once"
+        )
+        self.assertEqual(self.test.report["inventory"], {
+            "orphans": [{"name": "/tlg0001/tlg0001.tlg001.perseus-grc1.xml", "urn": "urn:cts:greekLit:tlg0001.tlg002.perseus-grc1"}],
+            "missing": []
+        })
+
+    def test_urn_index(self):
+        """ Test that the URN index matches URN exactly and finds metadata entries without text """
+        index = HookTest.test.UrnIndex()
+        for urn in (
+            "urn:cts:latinLit:phi1294.phi002.perseus-lat2", "urn:cts:latinLit:phi1294.phi002.perseus-eng2",
+            "urn:cts:latinLit:phi1294.phi001.perseus-lat2", "urn:cts:greekLit:phi1294.phi002.perseus-lat2",
+            "urn:cts:latinLit:phi1294.phi002.perseus-lat2.1"
+        ):
+            index.add(urn, "__cts__.xml")
+        self.assertEqual(len(index), 5)
+        self.assertEqual(list(index.textgroups), [("latinLit", "phi1294"), ("greekLit", "phi1294")])
+        self.assertEqual(sorted(index.textgroups[("latinLit", "phi1294")]["phi002"]), ["perseus-eng2", "perseus-lat2"])
+        self.assertIn("urn:cts:latinLit:phi1294.phi002.perseus-lat2", index)
+        self.assertIn("urn:cts:latinLit:phi1294.phi002.perseus-lat2.1", index, "URN not indexed should be matched")
+        for urn in (
+            "urn:cts:latinLit:phi1294.phi002", "urn:cts:latinLit:phi1294.phi002.perseus-lat2:1.1",
+            "urn:cts:latinLit:phi1294.phi003.perseus-lat2", "urn:cts:farsiLit:phi1294.phi002.perseus-lat2", ""
+        ):
+            self.assertNotIn(urn, index)
+
+        self.assertTrue(index.find("urn:cts:latinLit:phi1294.phi002.perseus-lat2", "lat2.xml"))
+        self.assertTrue(index.find("urn:cts:greekLit:phi1294.phi002.perseus-lat2", "grc.xml"))
+        self.assertFalse(index.find("urn:cts:latinLit:phi1294.phi002.perseus-ger1", "ger1.xml"))
+        self.assertEqual(index.orphans, [("ger1.xml", "urn:cts:latinLit:phi1294.phi002.perseus-ger1")])
+        self.assertEqual(index.missing(), [
+            ("urn:cts:latinLit:phi1294.phi001.perseus-lat2", "__cts__.xml"),
+            ("urn:cts:latinLit:phi1294.phi002.perseus-eng2", "__cts__.xml"),
+            ("urn:cts:latinLit:phi1294.phi002.perseus-lat2.1", "__cts__.xml")
+        ])
+
+    def test_resident_memory(self):
+        """ Test that the resident memory of the process is measured """
+        result, memory = HookTest.test.measured(len, "abc")
+        self.assertEqual(result, 3, "Result of the task should be returned")
+        if memory is not None:
+            self.assertGreater(memory, 1024 * 1024, "Python should use more than 1MB")
 
 class TestUnitLogs(unittest.TestCase):
     def test_init(self):
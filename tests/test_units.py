@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 
 import HookTest.capitains_units.cts
@@ -418,6 +420,15 @@ class TestText(unittest.TestCase):
         self.assertEqual(self.Epidoc.has_urn().__next__(), True, "Epidoc should work with translation and edition")
         self.Epidoc.xml = etree.fromstring(commentary.format("urn:cts:latinLit:phi1294.phi002.perseus-lat2"))
         self.assertEqual(self.Epidoc.has_urn().__next__(), True, "Epidoc should work with translation and edition")
+        # Edition URN is used first, wherever it is
+        self.Epidoc.xml = etree.fromstring(
+            """<TEI xmlns="http://www.tei-c.org/ns/1.0"><body><div type="translation" n="{}" />"""
+            """<div type="edition" n="{}" /></body></TEI>""".format(
+                "urn:cts:latinLit:phi1294.phi002.perseus-eng2", "urn:cts:latinLit:phi1294.phi002.perseus-lat2"
+            )
+        )
+        self.assertEqual(self.Epidoc.has_urn().__next__(), True, "Epidoc should work with translation and edition")
+        self.assertEqual(self.Epidoc.urn, "urn:cts:latinLit:phi1294.phi002.perseus-lat2", "Edition URN comes first")
         # Wrong epidoc should be wrong
         self.Epidoc.xml = etree.fromstring(part.format("urn:cts:latinLit:phi1294.phi002.perseus-lat2"))
         self.assertEqual(self.Epidoc.has_urn().__next__(), False, "Wrong epidoc should be wrong")
@@ -496,6 +507,27 @@ class TestText(unittest.TestCase):
         results = [result for result in unit.unique_passage()]
         self.assertEqual(results, [True], "Right citation with node collision should success")
 
+    def test_references_levels(self):
+        """ Test that the references of each level are the ones found by getValidReff """
+        for path in ["tests/passages/test_passage_success.xml", "tests/passages/test_passage_fail_1.xml",
+                     "tests/passages/test_empty_ref_fail.xml"]:
+            unit = HookTest.capitains_units.cts.CTSText_TestUnit(path)
+            list(unit.parsable())
+            for depth in range(1, len(unit.Text.citation) + 1):
+                level = unit.references().level(depth)
+                self.assertEqual(
+                    level.references, unit.Text.getValidReff(level=level.depth, _debug=True),
+                    "References of {} at level {} should be the same".format(path, level.depth)
+                )
+
+        unit = HookTest.capitains_units.cts.CTSText_TestUnit("tests/passages/test_passage_fail_1.xml")
+        list(unit.parsable())
+        self.assertEqual(
+            [unit.references().level(depth).duplicates for depth in [1, 2, 3]], [["1"], ["1.2", "1.pr", "3.1"], ["1.2.1", "1.pr.1", "3.1.1", "3.1.2"]],
+            "Duplicates should be found at each level"
+        )
+        self.assertIs(unit.references(), unit.references(), "References should be built once per text")
+
     def test_illegal_characters_fail(self):
         """ Test that illegal characters are detected"""
 
@@ -567,6 +599,24 @@ class TestText(unittest.TestCase):
             a, [True]
         )
 
+    def test_count_words_export(self):
+        """ Test that words are counted as in the plain text export, notes and header left out """
+        xml = etree.fromstring(
+            '<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader><p>header words</p><refsDecl n="CTS">'
+            '<cRefPattern n="line" matchPattern="(.+)" replacementPattern="#xpath(//tei:l[@n=\'$1\'])"/>'
+            '</refsDecl></teiHeader><text><body>'
+            '<div>a<!-- comment -->b<?pi instruction?>c <l n="1">one<note>no <hi>no</hi></note>two three</l>'
+            '<l n="2"><note><note>no</note>no</note>four  five </l></div></body></text></TEI>'
+        )
+        self.assertEqual(HookTest.capitains_units.cts.CTSText_TestUnit.words(xml), 8)
+        self.assertEqual(
+            HookTest.capitains_units.cts.CTSText_TestUnit.words(xml),
+            len(HookTest.capitains_units.cts.CTSText_TestUnit.splitter.findall(
+                CapitainsCtsText(resource=xml).export("text/plain", exclude=["tei:note", "tei:teiHeader"])
+            )),
+            "Count should be the same as the count of the export"
+        )
+
     def test_count_words_fails(self):
         """ Test collision of passages
         """
@@ -594,6 +644,28 @@ class TestText(unittest.TestCase):
         results = [result for result in unit.epidoc()]
         self.assertEqual(results, [True], "Epidoc RelaxNG should run correctly")
 
+    def test_xml_model_prolog(self):
+        """ Test that xml-model declarations are read from the prolog only when the file was not parsed
+        """
+        with tempfile.NamedTemporaryFile(suffix=".xml", dir="tests/test_auto_rng") as f:
+            f.write(b'<?xml version="1.0"?>\n<?xml-model href="epidoc.rng"?>\n<?other href="x.rng"?>'
+                    b'<TEI><broken></TEI>')
+            f.flush()
+            unit = HookTest.capitains_units.cts.CTSText_TestUnit(f.name)
+            self.assertEqual(
+                unit.xml_model_uris(), [os.path.abspath("tests/test_auto_rng/epidoc.rng")],
+                "Malformed body should not prevent reading the prolog"
+            )
+
+        unit = HookTest.capitains_units.cts.CTSText_TestUnit(
+            "tests/test_auto_rng/data/hafez/divan/hafez.divan.perseus-far1.xml"
+        )
+        unit.xml = etree.parse("tests/test_auto_rng/data/hafez/divan/hafez.divan.perseus-eng1.xml")
+        self.assertEqual(
+            unit.xml_model_uris(), [os.path.abspath("tests/test_auto_rng/epidoc.rng")],
+            "Parsed document should be used when available"
+        )
+
     def test_empty_references(self):
         """ Test whether a text has empty citation references
         """